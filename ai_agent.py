@@ -3,63 +3,215 @@
 import boto3
 import json
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from botocore.config import Config
 import time
+from result_cache import ResultCache, make_cache_key
 
-def ai_agent_clean(prompt, retries=3, delay=5):
+# Shared Bedrock client settings
+BEDROCK_REGION = 'us-east-1'
+BEDROCK_MAX_POOL_CONNECTIONS = 32  # Concurrent Bedrock calls served by one client
+
+# Cleaning model
+# CLEAN_MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+# CLEAN_MODEL_ID = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+CLEAN_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+# Cleaning system prompt
+CLEAN_SYSTEM_PROMPT = """
+אתה אפליקציית תמלול מקצועית. קיבלת קטע טקסט ותפקידך לבצע את המשימות הבאות:
+
+ניקוי שגיאות: נקה את הטקסט משגיאות כתיב, טעויות דקדוקיות ומילים חוזרות. ודא שהמשפטים זורמים בצורה טבעית.
+הוספת סימני פיסוק: הוסף סימני פיסוק מתאימים (כגון פסיקים, נקודות, סימני שאלה וקריאה) בכל מקום שנדרש, על מנת לשפר את הקריאות.
+המרת מספרים ותאריכים: המרה של מספרים (למשל, "שמונה" ל-8), תאריכים (למשל, "חמישה בספטמבר אלפיים עשרים ושלוש" ל-5.9.2023), וזמנים (למשל, "שתיים וחצי" ל-2:30), אם ישנם כאלו בטקסט.
+דוגמה: טקסט קלט: "היום יש לי פגישה בשעה שתיים וחצי אחרי הצהריים. אני מקווה שהיא תסתיים עד ארבע וחצי." תוצאה מבוקשת: "היום יש לי פגישה בשעה 2:30 אחרי הצהריים. אני מקווה שהיא תסתיים עד 4:30."
+
+תרשום ישירות את הטקסט המתוקן ואל תרשום לי כל פעם שאתה משנה משהו
+
+"""
+
+# Long transcripts are cleaned in chunks of about this many input tokens, so each
+# chunk's output stays well below max_tokens and chunks can be cleaned in parallel
+CLEAN_CHUNK_TOKENS = 1200
+CLEAN_OVERLAP_LINES = 1  # Lines of the previous chunk passed along as context
+CHARS_PER_TOKEN = 2      # Conservative estimate for Hebrew text
+
+# Prompt used for every chunk after the first, carrying the tail of the previous chunk
+CLEAN_CONTEXT_TEMPLATE = """
+הטקסט הבא הוא המשך של תמלול ארוך.
+השורות תחת "הקשר קודם" מובאות להבנת ההקשר בלבד - אל תכלול אותן בתשובה.
+נקה רק את הטקסט תחת "טקסט לניקוי".
+
+הקשר קודם:
+{context}
+
+טקסט לניקוי:
+{text}
+"""
+
+# Summary model
+SUMMARY_MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+
+# Summary system prompt
+SUMMARY_SYSTEM_PROMPT = """
+תסכם את התמלול של הדו-שיח הרפואי
+הסיכום שלך צריך להתחלק לשלושה חלקים:
+תלונה עיקרית
+היסטוריה רפואית ותלונות החולה
+תוכנית טיפול והמלצות
+"""
+
+# Summary sections, in the order the summary prompt defines them
+SUMMARY_SECTIONS = [
+    'תלונה עיקרית',
+    'היסטוריה רפואית ותלונות החולה',
+    'תוכנית טיפול והמלצות',
+]
+
+# Visits longer than this (estimated input tokens) are summarized with map-reduce
+SUMMARY_SINGLE_SHOT_TOKENS = 6000
+SUMMARY_SEGMENT_TOKENS = 4000  # Input tokens per map segment
+SUMMARY_MAP_MAX_TOKENS = 1500  # Output cap for each partial summary
+
+# Map step: summarize one segment of a long visit into the three sections
+SUMMARY_MAP_SYSTEM_PROMPT = """
+קיבלת קטע אחד מתוך תמלול ארוך של דו-שיח רפואי.
+תסכם רק את המידע שמופיע בקטע הזה, תחת שלוש הכותרות הבאות בדיוק:
+תלונה עיקרית
+היסטוריה רפואית ותלונות החולה
+תוכנית טיפול והמלצות
+אם אין בקטע מידע לאחד החלקים, כתוב תחת הכותרת "אין מידע".
+"""
+
+# Reduce step: merge the partial summaries section by section
+SUMMARY_REDUCE_SYSTEM_PROMPT = """
+קיבלת סיכומים חלקיים של קטעים עוקבים מתוך אותו ביקור רפואי, מקובצים לפי חלק.
+אחד אותם לסיכום אחד של הביקור, ללא כפילויות וללא סתירות.
+הסיכום שלך צריך להתחלק לשלושה חלקים:
+תלונה עיקרית
+היסטוריה רפואית ותלונות החולה
+תוכנית טיפול והמלצות
+"""
+
+# Process-wide Bedrock client, shared by all Streamlit sessions
+_bedrock_client = None
+_bedrock_client_lock = threading.Lock()
+
+# Process-wide cache of model results, configured from the environment on first use
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+# Bounded worker pool for parallel model calls, shared by all sessions
+LLM_MAX_WORKERS = 8
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix='bedrock')
+
+
+class ModelError(Exception):
+    """
+    A model call still failed after all retries; the last error is the __cause__.
     """
-    Cleans the provided text using Amazon Bedrock's Claude model.
 
-    Parameters:
-        prompt (str): The raw text to be cleaned.
-        retries (int): Number of retry attempts in case of failure.
-        delay (int): Delay between retries in seconds.
+
+def get_bedrock_client():
+    """
+    Returns the process-wide Amazon Bedrock runtime client, creating it on first use.
+
+    boto3 clients are thread-safe, so a single client (and its connection pool) is
+    reused by every clean/summary call instead of paying credential resolution,
+    endpoint setup and a new TLS handshake on each invocation.
 
     Returns:
-        str: The cleaned text or an error message.
-    """
-    # Load environment variables
-    load_dotenv()
-
-    # Configure the boto3 client with increased timeout settings
-    custom_config = Config(
-        connect_timeout=60,  # Connection timeout in seconds
-        read_timeout=120     # Read timeout in seconds
-    )
-
-    # Set up Amazon Bedrock client with custom config
-    bedrock = boto3.client(
-        service_name='bedrock-runtime',
-        region_name='us-east-1',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        config=custom_config  # Apply the custom timeout settings
-    )
-
-    # Configure the model
-    # model_id = 'anthropic.claude-3-sonnet-20240229-v1:0'
-    # model_id = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
-    model_id = 'anthropic.claude-3-haiku-20240307-v1:0'
-
-
-    # Define the system prompt
-    system_prompt = """
-    אתה אפליקציית תמלול מקצועית. קיבלת קטע טקסט ותפקידך לבצע את המשימות הבאות:
-
-    ניקוי שגיאות: נקה את הטקסט משגיאות כתיב, טעויות דקדוקיות ומילים חוזרות. ודא שהמשפטים זורמים בצורה טבעית.
-    הוספת סימני פיסוק: הוסף סימני פיסוק מתאימים (כגון פסיקים, נקודות, סימני שאלה וקריאה) בכל מקום שנדרש, על מנת לשפר את הקריאות.
-    המרת מספרים ותאריכים: המרה של מספרים (למשל, "שמונה" ל-8), תאריכים (למשל, "חמישה בספטמבר אלפיים עשרים ושלוש" ל-5.9.2023), וזמנים (למשל, "שתיים וחצי" ל-2:30), אם ישנם כאלו בטקסט.
-    דוגמה: טקסט קלט: "היום יש לי פגישה בשעה שתיים וחצי אחרי הצהריים. אני מקווה שהיא תסתיים עד ארבע וחצי." תוצאה מבוקשת: "היום יש לי פגישה בשעה 2:30 אחרי הצהריים. אני מקווה שהיא תסתיים עד 4:30."
-    
-    תרשום ישירות את הטקסט המתוקן ואל תרשום לי כל פעם שאתה משנה משהו
-    
-    """
-
-    # Prepare the request body
-    request_body = {
+        botocore.client.BaseClient: The shared bedrock-runtime client.
+    """
+    global _bedrock_client
+    if _bedrock_client is None:
+        with _bedrock_client_lock:
+            if _bedrock_client is None:
+                # Load environment variables
+                load_dotenv()
+
+                # Configure the boto3 client with increased timeout settings and a larger pool
+                custom_config = Config(
+                    connect_timeout=60,  # Connection timeout in seconds
+                    read_timeout=120,    # Read timeout in seconds
+                    max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    # _invoke_model retries failed calls itself; botocore makes a single
+                    # attempt (adaptive mode still slows the client down when throttled)
+                    retries={'max_attempts': 1, 'mode': 'adaptive'}
+                )
+
+                # Use a dedicated session so client creation doesn't race on the default one
+                session = boto3.session.Session(
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                    region_name=BEDROCK_REGION
+                )
+                _bedrock_client = session.client(
+                    service_name='bedrock-runtime',
+                    config=custom_config  # Apply the custom timeout settings
+                )
+    return _bedrock_client
+
+
+def warm_up_bedrock():
+    """
+    Pre-warms the shared Bedrock client at app startup so the first visit doesn't
+    pay for client construction and credential resolution.
+
+    Returns:
+        bool: True if the client is ready, False if it could not be created.
+    """
+    try:
+        # Client creation resolves credentials and endpoint up front
+        get_bedrock_client()
+        return True
+    except Exception as e:
+        print(f"Bedrock warm-up failed: {e}")
+        return False
+
+
+def get_result_cache():
+    """
+    Returns the process-wide model result cache, creating it on first use.
+
+    The in-memory LRU is always on. Setting AI_CACHE_DIR in the environment adds a disk
+    tier, bounded by AI_CACHE_TTL (seconds) and AI_CACHE_MAX_BYTES.
+
+    Returns:
+        ResultCache: The shared cache.
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                load_dotenv()
+                _result_cache = ResultCache(
+                    max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '256')),
+                    disk_dir=os.getenv('AI_CACHE_DIR') or None,
+                    ttl=float(os.getenv('AI_CACHE_TTL', str(7 * 24 * 3600))),
+                    max_disk_bytes=int(os.getenv('AI_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+                )
+    return _result_cache
+
+
+def cache_stats():
+    """
+    Returns the hit/miss counters of the model result cache.
+    """
+    return get_result_cache().stats()
+
+
+def _build_request_body(system_prompt, prompt, max_tokens):
+    """
+    Builds the Anthropic messages request body for Bedrock.
+    """
+    return {
         "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 3000,
+        "max_tokens": max_tokens,
         "temperature": 0,
         "system": system_prompt,
         "messages": [
@@ -70,6 +222,36 @@ def ai_agent_clean(prompt, retries=3, delay=5):
         ],
     }
 
+
+def _invoke_model(model_id, system_prompt, prompt, retries, delay, max_tokens=3000):
+    """
+    Invokes a Claude model on Amazon Bedrock through the shared client, with retry logic.
+
+    Parameters:
+        model_id (str): The Bedrock model ID.
+        system_prompt (str): The system prompt for the model.
+        prompt (str): The user text.
+        retries (int): Number of retry attempts in case of failure.
+        delay (int): Delay between retries in seconds.
+        max_tokens (int): Maximum number of output tokens.
+
+    Returns:
+        str: The model output text.
+
+    Raises:
+        ModelError: If every attempt failed.
+    """
+    request_body = _build_request_body(system_prompt, prompt, max_tokens)
+
+    # Identical requests are served from the cache
+    cache = get_result_cache()
+    cache_key = make_cache_key(model_id, system_prompt, prompt, max_tokens=max_tokens, temperature=0)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    bedrock = get_bedrock_client()
+
     # Invoke the model with retry logic
     for attempt in range(1, retries + 1):
         try:
@@ -81,89 +263,329 @@ def ai_agent_clean(prompt, retries=3, delay=5):
             # Parse the response
             result = json.loads(response["body"].read())
 
-            # Extract and return the content
-            return result['content'][0]['text']
+            # Extract, cache and return the content
+            text = result['content'][0]['text']
+            cache.put(cache_key, text)
+            return text
 
         except Exception as e:
             if attempt < retries:
                 print(f"Attempt {attempt} failed: {e}. Retrying in {delay} seconds...")
                 time.sleep(delay)
             else:
-                return f"An error occurred after {retries} attempts: {str(e)}"
+                raise ModelError(f"The model call failed after {retries} attempts: {e}") from e
 
-def ai_agent_summary(prompt, retries=3, delay=5):
+
+def _invoke_model_stream(model_id, system_prompt, prompt, retries, delay, max_tokens=3000):
     """
-    Summarizes the provided text using Amazon Bedrock's Claude model.
+    Invokes a Claude model on Amazon Bedrock with response streaming and yields the
+    text as it is generated.
+
+    A failed attempt is retried only if nothing was yielded yet; once text has been
+    streamed to the caller, a failure ends the stream with ModelError.
 
     Parameters:
-        prompt (str): The text to be summarized.
+        model_id (str): The Bedrock model ID.
+        system_prompt (str): The system prompt for the model.
+        prompt (str): The user text.
         retries (int): Number of retry attempts in case of failure.
         delay (int): Delay between retries in seconds.
+        max_tokens (int): Maximum number of output tokens.
 
-    Returns:
-        str: The summary text or an error message.
-    """
-    # Load environment variables
-    load_dotenv()
-
-    # Configure the boto3 client with increased timeout settings
-    custom_config = Config(
-        connect_timeout=60,  # Connection timeout in seconds
-        read_timeout=120     # Read timeout in seconds
-    )
-
-    # Set up Amazon Bedrock client with custom config
-    bedrock = boto3.client(
-        service_name='bedrock-runtime',
-        region_name='us-east-1',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        config=custom_config  # Apply the custom timeout settings
-    )
-
-    # Configure the model
-    model_id = 'anthropic.claude-3-sonnet-20240229-v1:0'
-
-    # Define the system prompt
-    system_prompt = """
-    תסכם את התמלול של הדו-שיח הרפואי
-    הסיכום שלך צריך להתחלק לשלושה חלקים:
-    תלונה עיקרית
-    היסטוריה רפואית ותלונות החולה
-    תוכנית טיפול והמלצות
-    """
-
-    # Prepare the request body
-    request_body = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 3000,
-        "temperature": 0,
-        "system": system_prompt,
-        "messages": [
-            {
-                "role": "user",
-                "content": [{"type": "text", "text": system_prompt + "\n" + prompt}]
-            }
-        ],
-    }
+    Yields:
+        str: Text chunks in generation order.
+
+    Raises:
+        ModelError: If every attempt failed, or the stream broke off part way.
+    """
+    request_body = _build_request_body(system_prompt, prompt, max_tokens)
+
+    # A cached result is yielded in one piece
+    cache = get_result_cache()
+    cache_key = make_cache_key(model_id, system_prompt, prompt, max_tokens=max_tokens, temperature=0)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    bedrock = get_bedrock_client()
 
-    # Invoke the model with retry logic
     for attempt in range(1, retries + 1):
+        started = False
         try:
-            response = bedrock.invoke_model(
+            response = bedrock.invoke_model_with_response_stream(
                 modelId=model_id,
                 body=json.dumps(request_body),
             )
 
-            # Parse the response
-            result = json.loads(response["body"].read())
-
-            # Extract and return the content
-            return result['content'][0]['text']
+            parts = []
+            for event in response["body"]:
+                chunk = event.get("chunk")
+                if not chunk:
+                    continue
+                data = json.loads(chunk["bytes"])
+                # Only text deltas carry output; other events are message bookkeeping
+                if data.get("type") == "content_block_delta":
+                    text = data["delta"].get("text", "")
+                    if text:
+                        started = True
+                        parts.append(text)
+                        yield text
+            # Only complete responses are cached
+            cache.put(cache_key, ''.join(parts))
+            return
 
         except Exception as e:
+            if started:
+                raise ModelError(f"The model stream broke off: {e}") from e
             if attempt < retries:
                 print(f"Attempt {attempt} failed: {e}. Retrying in {delay} seconds...")
                 time.sleep(delay)
             else:
-                return f"An error occurred after {retries} attempts: {str(e)}"
+                raise ModelError(f"The model call failed after {retries} attempts: {e}") from e
+
+
+def _estimate_tokens(text):
+    """
+    Roughly estimates the number of model tokens in a text.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_long_line(line, max_tokens):
+    """
+    Splits a single line that exceeds the token budget at sentence, then word boundaries,
+    and by length where there is no boundary left.
+    """
+    width = max(1, (max_tokens - 1) * CHARS_PER_TOKEN)  # Characters that fit the budget
+    pieces = []
+    current = ""
+    for sentence in re.split(r'(?<=[.!?])\s+', line):
+        words = [sentence] if _estimate_tokens(sentence) <= max_tokens else sentence.split(' ')
+        for word in words:
+            # A run without spaces that is still too long is cut into budget-sized parts
+            parts = [word]
+            if _estimate_tokens(word) > max_tokens:
+                parts = [word[i:i + width] for i in range(0, len(word), width)]
+            for part in parts:
+                candidate = f"{current} {part}" if current else part
+                if current and _estimate_tokens(candidate) > max_tokens:
+                    pieces.append(current)
+                    current = part
+                else:
+                    current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text, max_tokens=CLEAN_CHUNK_TOKENS):
+    """
+    Splits a transcript into chunks of at most max_tokens (estimated), cutting only at
+    line (speaker turn) boundaries unless a single line is itself too long.
+
+    Parameters:
+        text (str): The transcript text.
+        max_tokens (int): Token budget per chunk.
+
+    Returns:
+        list[list[str]]: The chunks, each as a list of lines.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in text.split('\n'):
+        if not line.strip():
+            continue
+        for piece in _split_long_line(line, max_tokens) if _estimate_tokens(line) > max_tokens else [line]:
+            piece_tokens = _estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _clean_chunk_prompts(prompt):
+    """
+    Builds the per-chunk prompts for cleaning a long transcript. Every chunk after the
+    first carries the last lines of the previous chunk as read-only context, so sentences
+    cut at a chunk boundary are still cleaned correctly.
+    """
+    chunks = split_into_chunks(prompt)
+    prompts = []
+    for index, lines in enumerate(chunks):
+        text = '\n'.join(lines)
+        if index == 0 or CLEAN_OVERLAP_LINES <= 0:
+            prompts.append(text)
+        else:
+            context = '\n'.join(chunks[index - 1][-CLEAN_OVERLAP_LINES:])
+            prompts.append(CLEAN_CONTEXT_TEMPLATE.format(context=context, text=text))
+    return prompts
+
+
+def ai_agent_clean(prompt, retries=3, delay=5):
+    """
+    Cleans the provided text using Amazon Bedrock's Claude model.
+
+    Long texts are split into token-budgeted chunks along speaker turns, cleaned
+    concurrently on the shared worker pool and joined back in order.
+
+    Parameters:
+        prompt (str): The raw text to be cleaned.
+        retries (int): Number of retry attempts in case of failure.
+        delay (int): Delay between retries in seconds.
+
+    Returns:
+        str: The cleaned text.
+
+    Raises:
+        ModelError: If any chunk could not be cleaned; a partly cleaned text is never returned.
+    """
+    chunk_prompts = _clean_chunk_prompts(prompt)
+    if len(chunk_prompts) <= 1:
+        return _invoke_model(CLEAN_MODEL_ID, CLEAN_SYSTEM_PROMPT, prompt, retries, delay)
+
+    futures = [
+        _llm_executor.submit(_invoke_model, CLEAN_MODEL_ID, CLEAN_SYSTEM_PROMPT, chunk, retries, delay)
+        for chunk in chunk_prompts
+    ]
+    return '\n'.join(future.result().strip() for future in futures)
+
+def _split_sections(summary):
+    """
+    Splits a summary into its three sections by their headers.
+
+    Returns:
+        dict: Section header -> section text, for the sections that were found.
+    """
+    header_pattern = '|'.join(re.escape(section) for section in SUMMARY_SECTIONS)
+    matches = list(re.finditer(rf'^[#*\s]*({header_pattern})[*:\s]*$', summary, re.MULTILINE))
+    sections = {}
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(summary)
+        sections[match.group(1)] = summary[match.end():end].strip()
+    return sections
+
+
+def _map_summaries(prompt, retries, delay):
+    """
+    Map step: summarizes the segments of a long visit in parallel and groups the
+    partial summaries by section, ready for the reduce call.
+
+    Returns:
+        str: The grouped partial summaries.
+    """
+    segments = ['\n'.join(lines) for lines in split_into_chunks(prompt, SUMMARY_SEGMENT_TOKENS)]
+    futures = [
+        _llm_executor.submit(
+            _invoke_model, SUMMARY_MODEL_ID, SUMMARY_MAP_SYSTEM_PROMPT, segment, retries, delay,
+            SUMMARY_MAP_MAX_TOKENS
+        )
+        for segment in segments
+    ]
+
+    grouped = {section: [] for section in SUMMARY_SECTIONS}
+    unstructured = []
+    for number, future in enumerate(futures, start=1):
+        partial = future.result()
+        sections = _split_sections(partial)
+        if not sections:
+            # Keep partial summaries that didn't follow the headers rather than dropping them
+            unstructured.append(f"קטע {number}:\n{partial.strip()}")
+            continue
+        for section, text in sections.items():
+            grouped[section].append(f"קטע {number}: {text}")
+
+    parts = [section + ':\n' + '\n'.join(texts) for section, texts in grouped.items() if texts]
+    if unstructured:
+        parts.append('סיכומים נוספים:\n' + '\n'.join(unstructured))
+    return '\n\n'.join(parts)
+
+
+def _use_map_reduce(prompt):
+    """
+    Returns True if the text is too long to summarize in a single model call.
+    """
+    return _estimate_tokens(prompt) > SUMMARY_SINGLE_SHOT_TOKENS
+
+
+def ai_agent_summary(prompt, retries=3, delay=5):
+    """
+    Summarizes the provided text using Amazon Bedrock's Claude model.
+
+    Short visits are summarized in one call. Long visits are split into segments that
+    are summarized in parallel into the three sections (map), then merged section by
+    section in a final call (reduce).
+
+    Parameters:
+        prompt (str): The text to be summarized.
+        retries (int): Number of retry attempts in case of failure.
+        delay (int): Delay between retries in seconds.
+
+    Returns:
+        str: The summary text.
+
+    Raises:
+        ModelError: If a model call failed.
+    """
+    if not _use_map_reduce(prompt):
+        return _invoke_model(SUMMARY_MODEL_ID, SUMMARY_SYSTEM_PROMPT, prompt, retries, delay)
+
+    grouped = _map_summaries(prompt, retries, delay)
+    return _invoke_model(SUMMARY_MODEL_ID, SUMMARY_REDUCE_SYSTEM_PROMPT, grouped, retries, delay)
+
+
+def ai_agent_clean_stream(prompt, retries=3, delay=5):
+    """
+    Cleans the provided text like ai_agent_clean, yielding the output as it is generated.
+
+    Parameters:
+        prompt (str): The raw text to be cleaned.
+        retries (int): Number of retry attempts in case of failure.
+        delay (int): Delay between retries in seconds.
+
+    Yields:
+        str: Chunks of the cleaned text.
+
+    Raises:
+        ModelError: If one of the background chunks could not be cleaned.
+    """
+    chunk_prompts = _clean_chunk_prompts(prompt)
+    if len(chunk_prompts) <= 1:
+        yield from _invoke_model_stream(CLEAN_MODEL_ID, CLEAN_SYSTEM_PROMPT, prompt, retries, delay)
+        return
+
+    # Clean the remaining chunks in the background while the first one streams
+    futures = [
+        _llm_executor.submit(_invoke_model, CLEAN_MODEL_ID, CLEAN_SYSTEM_PROMPT, chunk, retries, delay)
+        for chunk in chunk_prompts[1:]
+    ]
+    yield from _invoke_model_stream(CLEAN_MODEL_ID, CLEAN_SYSTEM_PROMPT, chunk_prompts[0], retries, delay)
+    for future in futures:
+        yield '\n' + future.result().strip()
+
+
+def ai_agent_summary_stream(prompt, retries=3, delay=5):
+    """
+    Summarizes the provided text like ai_agent_summary, yielding the output as it is generated.
+
+    Parameters:
+        prompt (str): The text to be summarized.
+        retries (int): Number of retry attempts in case of failure.
+        delay (int): Delay between retries in seconds.
+
+    Yields:
+        str: Chunks of the summary text.
+    """
+    if not _use_map_reduce(prompt):
+        yield from _invoke_model_stream(SUMMARY_MODEL_ID, SUMMARY_SYSTEM_PROMPT, prompt, retries, delay)
+        return
+
+    # The map step has to finish before anything can be shown; the reduce call streams
+    grouped = _map_summaries(prompt, retries, delay)
+    yield from _invoke_model_stream(SUMMARY_MODEL_ID, SUMMARY_REDUCE_SYSTEM_PROMPT, grouped, retries, delay)
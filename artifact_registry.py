@@ -0,0 +1,116 @@
+# artifact_registry.py
+
+import hashlib
+import json
+import threading
+import time
+from botocore.exceptions import ClientError
+from storage import get_s3_client
+
+# Text artifacts produced for every processed audio file
+ARTIFACT_FILES = ['raw.txt', 'clean.txt', 'summary.txt']
+
+HASH_CHUNK_SIZE = 1024 * 1024  # Read uploads 1 MiB at a time while hashing
+
+
+def hash_audio(fileobj, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Computes the SHA-256 of an audio file object by streaming it in chunks, then
+    rewinds it so it can still be uploaded.
+
+    Parameters:
+        fileobj: A readable, seekable binary file object (e.g. a Streamlit UploadedFile).
+        chunk_size (int): Bytes read per step.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b''):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+class ArtifactRegistry:
+    """
+    Maps audio content hashes to the S3 folder holding their processed artifacts, so a
+    file that was already transcribed is never uploaded or transcribed again.
+
+    Records are stored in S3 under <prefix>/<hash>.json and mirrored in memory.
+    """
+
+    def __init__(self, bucket_name, prefix='registry'):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.s3_client = get_s3_client()  # The pooled client shared by every S3 caller
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def _record_key(self, audio_hash):
+        return f"{self.prefix}/{audio_hash}.json"
+
+    def lookup(self, audio_hash):
+        """
+        Returns the registry record for an audio hash, or None if it was never processed.
+
+        Returns:
+            dict: {'folder_name', 'audio_key', 'created'} or None.
+        """
+        with self._lock:
+            if audio_hash in self._records:
+                return self._records[audio_hash]
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self._record_key(audio_hash))
+            record = json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+        with self._lock:
+            self._records[audio_hash] = record
+        return record
+
+    def register(self, audio_hash, folder_name, audio_key):
+        """
+        Records that the audio with this hash was fully processed into folder_name.
+        """
+        record = {'folder_name': folder_name, 'audio_key': audio_key, 'created': time.time()}
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=self._record_key(audio_hash),
+            Body=json.dumps(record),
+            ContentType='application/json'
+        )
+        with self._lock:
+            self._records[audio_hash] = record
+        return record
+
+    def restore(self, record, folder_name):
+        """
+        Makes the artifacts of an already processed file available under folder_name,
+        using server-side copies (no download or re-upload).
+        """
+        if record['folder_name'] == folder_name:
+            return
+        for file_name in ARTIFACT_FILES:
+            self.s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=f"{folder_name}/{file_name}",
+                CopySource={'Bucket': self.bucket_name, 'Key': f"{record['folder_name']}/{file_name}"}
+            )
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_artifact_registry(bucket_name):
+    """
+    Returns the process-wide registry for a bucket, shared by all sessions.
+    """
+    with _registries_lock:
+        if bucket_name not in _registries:
+            _registries[bucket_name] = ArtifactRegistry(bucket_name)
+        return _registries[bucket_name]
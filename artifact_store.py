@@ -0,0 +1,135 @@
+# artifact_store.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from storage import get_s3_client
+
+ARTIFACT_REVALIDATE_SECONDS = 30   # Cached artifacts younger than this are used without asking S3
+ARTIFACT_PREFETCH_WORKERS = 6      # Shared by all sessions
+
+# Process-wide pool for artifact downloads
+_prefetch_executor = ThreadPoolExecutor(max_workers=ARTIFACT_PREFETCH_WORKERS, thread_name_prefix='artifact-prefetch')
+
+
+class _CachedArtifact:
+    __slots__ = ('text', 'etag', 'checked')
+
+    def __init__(self, text, etag, checked):
+        self.text = text
+        self.etag = etag          # S3 ETag of the version we hold, for conditional requests
+        self.checked = checked    # time.monotonic() of the last confirmation against S3
+
+
+class ArtifactStore:
+    """
+    Per-session cache of the text artifacts (raw, clean, summary) of a bucket.
+
+    The page seeds it with put() with the texts a finished job produced, so the views
+    never download what this session just processed. Other artifacts are prefetched
+    concurrently, and cached entries are revalidated with ETag-conditional GETs (an
+    unchanged artifact costs a 304, not a download).
+    """
+
+    def __init__(self, bucket_name, revalidate_seconds=ARTIFACT_REVALIDATE_SECONDS):
+        self.bucket_name = bucket_name
+        self.revalidate_seconds = revalidate_seconds
+        self.downloads = 0        # Full GETs
+        self.revalidations = 0    # Conditional GETs answered with 304
+        self._artifacts = {}
+        self._pending = {}        # key -> Future of a fetch in progress
+        self._lock = threading.Lock()
+
+    def put(self, key, text, etag=None):
+        """
+        Seeds the cache with an artifact that was just written to S3.
+
+        Parameters:
+            key (str): The S3 key.
+            text (str): The artifact's content.
+            etag (str): The ETag returned by put_object, if known.
+        """
+        with self._lock:
+            self._artifacts[key] = _CachedArtifact(text, etag, time.monotonic())
+
+    def invalidate(self, keys):
+        """
+        Drops cached artifacts that were replaced behind the store's back (e.g. by a
+        server-side copy).
+        """
+        with self._lock:
+            for key in keys:
+                self._artifacts.pop(key, None)
+
+    def prefetch(self, keys):
+        """
+        Starts fetching (or revalidating) the given artifacts in the background,
+        skipping those that are fresh or already being fetched.
+        """
+        with self._lock:
+            for key in keys:
+                if key not in self._pending and not self._is_fresh(key):
+                    self._pending[key] = _prefetch_executor.submit(self._prefetch_one, key)
+
+    def get(self, key):
+        """
+        Returns an artifact's text, from the cache when it is fresh.
+
+        Raises:
+            ClientError: If the artifact can't be read from S3.
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None and self._is_fresh(key):
+                return self._artifacts[key].text
+        if pending is not None:
+            return pending.result()
+        return self._refresh(key)
+
+    def _is_fresh(self, key):
+        artifact = self._artifacts.get(key)
+        return artifact is not None and time.monotonic() - artifact.checked < self.revalidate_seconds
+
+    def _prefetch_one(self, key):
+        try:
+            return self._refresh(key)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _refresh(self, key):
+        """
+        Fetches an artifact, or confirms the cached version is still current.
+        """
+        with self._lock:
+            cached = self._artifacts.get(key)
+        request = {'Bucket': self.bucket_name, 'Key': key}
+        if cached is not None and cached.etag:
+            request['IfNoneMatch'] = cached.etag
+        try:
+            response = get_s3_client().get_object(**request)
+        except ClientError as e:
+            if cached is not None and e.response['Error']['Code'] in ('304', 'NotModified'):
+                with self._lock:
+                    cached.checked = time.monotonic()
+                    self.revalidations += 1
+                return cached.text
+            raise
+
+        text = response['Body'].read().decode('utf-8')
+        with self._lock:
+            self._artifacts[key] = _CachedArtifact(text, response.get('ETag'), time.monotonic())
+            self.downloads += 1
+        return text
+
+    def stats(self):
+        """
+        Returns how many artifacts are cached and how S3 was used.
+        """
+        with self._lock:
+            return {
+                "cached": len(self._artifacts),
+                "downloads": self.downloads,
+                "revalidations": self.revalidations,
+            }
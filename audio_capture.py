@@ -0,0 +1,122 @@
+# audio_capture.py
+
+import threading
+import numpy as np
+
+# Capture format shared by live transcription and the archived recording
+SAMPLE_RATE = 16000
+CHANNELS = 1
+BLOCK_SIZE = 2048  # Frames per block
+DTYPE = 'int16'
+
+
+class AudioCapture:
+    """
+    Owns the microphone and fans every captured PCM block out to any number of consumers
+    (live transcription, archive writer, level meter...).
+
+    Each block is copied out of the driver buffer once and handed to all consumers as
+    the same read-only memoryview, so consumers see identical, sample-aligned audio.
+    Consumers run on the audio thread and must return quickly. When capture stops,
+    every consumer is called once with (None, None) to mark the end of the stream.
+    """
+
+    def __init__(self, samplerate=SAMPLE_RATE, channels=CHANNELS, blocksize=BLOCK_SIZE, dtype=DTYPE):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.dtype = dtype
+        self._consumers = []
+        self._lock = threading.Lock()
+        self._stream = None
+
+    def subscribe(self, consumer):
+        """
+        Adds a consumer, called as consumer(block, status) for every captured block.
+
+        Parameters:
+            consumer (callable): block is a memoryview over the int16 PCM bytes,
+                status is the sounddevice CallbackFlags of the block. Both are None
+                once, when capture stops.
+
+        Returns:
+            callable: The consumer, for unsubscribe.
+        """
+        with self._lock:
+            # Copy-on-write, so the audio callback can iterate without holding the lock
+            self._consumers = self._consumers + [consumer]
+        return consumer
+
+    def unsubscribe(self, consumer):
+        """
+        Removes a consumer added with subscribe.
+        """
+        with self._lock:
+            self._consumers = [c for c in self._consumers if c is not consumer]
+
+    @property
+    def active(self):
+        return self._stream is not None
+
+    def start(self):
+        """
+        Opens the input device and starts capturing. Calling start again is a no-op.
+        """
+        if self._stream is not None:
+            return
+        # Imported here: loading sounddevice needs PortAudio, which headless users of
+        # the format constants above (batch, workers) don't have
+        import sounddevice as sd
+        self._stream = sd.RawInputStream(
+            channels=self.channels,
+            samplerate=self.samplerate,
+            callback=self._callback,
+            blocksize=self.blocksize,
+            dtype=self.dtype
+        )
+        self._stream.start()
+
+    def stop(self):
+        """
+        Stops capturing, releases the input device and signals end of stream to the consumers.
+        """
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+            self._notify(None, None)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _callback(self, indata, frame_count, time_info, status):
+        self._notify(memoryview(bytes(indata)), status)
+
+    def _notify(self, block, status):
+        for consumer in self._consumers:
+            try:
+                consumer(block, status)
+            except Exception as e:
+                print(f"Audio consumer failed: {e}")
+
+
+class LevelMeter:
+    """
+    Capture consumer that tracks the input level, e.g. for a microphone indicator.
+    """
+
+    def __init__(self):
+        self.rms = 0.0   # RMS of the last block, 0..1
+        self.peak = 0.0  # Peak of the last block, 0..1
+
+    def __call__(self, block, status):
+        if block is None:
+            return
+        samples = np.frombuffer(block, dtype=np.int16).astype(np.float32) / 32768.0
+        if samples.size:
+            self.rms = float(np.sqrt(np.mean(samples * samples)))
+            self.peak = float(np.max(np.abs(samples)))
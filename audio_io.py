@@ -0,0 +1,82 @@
+# audio_io.py
+
+import wave
+import numpy as np
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):  # soundfile missing, or libsndfile not available
+    sf = None
+
+
+class _WaveReader:
+    """
+    Minimal int16 reader over the stdlib wave module, used when soundfile is unavailable.
+    """
+
+    def __init__(self, fileobj):
+        self._wav = wave.open(fileobj, 'rb')
+        if self._wav.getsampwidth() != 2:
+            raise ValueError("Only 16-bit WAV files are supported without soundfile")
+        self.samplerate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.frames = self._wav.getnframes()
+
+    def read(self, frames):
+        data = self._wav.readframes(frames)
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+
+    def seek(self, frame):
+        self._wav.setpos(frame)
+
+    def close(self):
+        self._wav.close()
+
+
+class _SoundFileReader:
+    """
+    int16 reader over soundfile (WAV, FLAC, MP3...).
+    """
+
+    def __init__(self, fileobj):
+        self._file = sf.SoundFile(fileobj)
+        self.samplerate = self._file.samplerate
+        self.channels = self._file.channels
+        self.frames = self._file.frames
+
+    def read(self, frames):
+        return self._file.read(frames, dtype='int16', always_2d=True)
+
+    def seek(self, frame):
+        self._file.seek(frame)
+
+    def close(self):
+        self._file.close()
+
+
+def open_audio(fileobj):
+    """
+    Opens an audio file object for block-wise reading as int16 samples.
+
+    The returned reader has samplerate, channels and frames attributes and
+    read(frames) -> ndarray of shape (n, channels), seek(frame) and close() methods.
+    Without soundfile only 16-bit WAV can be read.
+
+    Parameters:
+        fileobj: A readable, seekable binary file object.
+    """
+    fileobj.seek(0)
+    if sf is not None:
+        return _SoundFileReader(fileobj)
+    return _WaveReader(fileobj)
+
+
+def write_wav(fileobj, samples, samplerate):
+    """
+    Writes int16 samples of shape (n, channels) as a WAV file into fileobj.
+    """
+    with wave.open(fileobj, 'wb') as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
@@ -0,0 +1,149 @@
+# audio_normalize.py
+
+import tempfile
+import numpy as np
+from audio_capture import SAMPLE_RATE
+from audio_io import open_audio
+from recording_sink import CONTENT_TYPES, ENCODERS, RECORDING_FORMAT
+
+NORMALIZE_BLOCK_SECONDS = 1          # Input decoded and resampled one block at a time
+NORMALIZE_MEMORY_BUDGET = 8 * 1024 * 1024  # Encoded output kept in RAM before spilling to a temp file
+RESAMPLE_ZERO_CROSSINGS = 16         # Half-width of the interpolation kernel, in output samples
+RESAMPLE_ROLLOFF = 0.95              # Anti-aliasing cutoff as a fraction of the output Nyquist frequency
+
+
+class StreamingResampler:
+    """
+    Band-limited (windowed-sinc) resampler over a stream of float32 mono blocks.
+
+    Every output sample is computed in one vectorized pass per block; the few input
+    samples still needed by the kernel are carried over to the next block, so memory
+    stays bounded by the block size.
+    """
+
+    def __init__(self, in_rate, out_rate=SAMPLE_RATE):
+        self.step = in_rate / out_rate  # Input samples per output sample
+        self.cutoff = min(1.0, out_rate / in_rate) * RESAMPLE_ROLLOFF
+        self.half_width = int(np.ceil(RESAMPLE_ZERO_CROSSINGS / self.cutoff))
+        self._offsets = np.arange(-self.half_width + 1, self.half_width + 1)
+        # Leading zeros so the first output sample has a full kernel
+        self._buffer = np.zeros(self.half_width, dtype=np.float32)
+        self._position = float(self.half_width)  # Next output time, in buffer samples
+
+    def process(self, samples):
+        """
+        Resamples one block.
+
+        Parameters:
+            samples (ndarray): float32 mono samples.
+
+        Returns:
+            ndarray: float32 samples at the output rate (possibly empty).
+        """
+        buffer = np.concatenate((self._buffer, samples))
+        last = len(buffer) - 1 - self.half_width  # Output times must leave room for the kernel
+        n_out = int(np.floor((last - self._position) / self.step)) + 1 if last >= self._position else 0
+        if n_out <= 0:
+            self._buffer = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        times = self._position + np.arange(n_out) * self.step
+        base = np.floor(times).astype(np.int64)
+        distance = self._offsets[None, :] - (times - base)[:, None]
+        window = 0.5 * (1.0 + np.cos(np.pi * np.clip(distance / self.half_width, -1.0, 1.0)))
+        kernel = (self.cutoff * np.sinc(self.cutoff * distance) * window).astype(np.float32)
+        out = np.sum(buffer[base[:, None] + self._offsets[None, :]] * kernel, axis=1)
+
+        # Keep only the input the next outputs still reach back to
+        self._position += n_out * self.step
+        drop = max(0, int(np.floor(self._position)) - self.half_width)
+        self._buffer = buffer[drop:]
+        self._position -= drop
+        return out
+
+    def flush(self):
+        """
+        Returns the last output samples, padding the input with silence.
+        """
+        return self.process(np.zeros(self.half_width, dtype=np.float32))
+
+
+def normalized_blocks(reader, start_frame=0, frames=None, out_rate=SAMPLE_RATE):
+    """
+    Reads part of a file and yields it downmixed to mono and resampled, as int16 blocks.
+
+    Parameters:
+        reader: An audio_io reader.
+        start_frame (int): First input frame.
+        frames (int): Input frames to read; None reads to the end.
+        out_rate (int): Output sample rate.
+    """
+    reader.seek(start_frame)
+    resampler = StreamingResampler(reader.samplerate, out_rate) if reader.samplerate != out_rate else None
+    remaining = reader.frames - start_frame if frames is None else frames
+    block_frames = int(NORMALIZE_BLOCK_SECONDS * reader.samplerate)
+    while remaining > 0:
+        block = reader.read(min(block_frames, remaining))
+        if len(block) == 0:
+            break
+        remaining -= len(block)
+        mono = block.astype(np.float32).mean(axis=1)
+        yield _to_int16(resampler.process(mono) if resampler else mono)
+    if resampler:
+        yield _to_int16(resampler.flush())
+
+
+def _to_int16(samples):
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+
+class NormalizedAudio:
+    """
+    An upload converted to 16 kHz mono, ready to be sent to S3.
+    """
+
+    def __init__(self, fileobj, audio_format, source_bytes):
+        self.fileobj = fileobj
+        self.file_extension = audio_format
+        self.content_type = CONTENT_TYPES[audio_format]
+        self.source_bytes = source_bytes
+        fileobj.seek(0, 2)
+        self.size = fileobj.tell()
+        fileobj.seek(0)
+
+
+def normalize_audio(fileobj, out_rate=SAMPLE_RATE, audio_format=RECORDING_FORMAT):
+    """
+    Converts an uploaded file to mono at out_rate and re-encodes it compactly (FLAC
+    when soundfile is available, WAV otherwise), streaming block by block.
+
+    Files that are already mono at out_rate, or that can't be decoded here (MP3
+    without soundfile), are left alone.
+
+    Parameters:
+        fileobj: A readable, seekable binary file object.
+
+    Returns:
+        NormalizedAudio | None: The converted audio, or None to upload the original.
+    """
+    try:
+        reader = open_audio(fileobj)
+    except Exception:
+        fileobj.seek(0)
+        return None
+
+    try:
+        if reader.samplerate == out_rate and reader.channels == 1:
+            return None
+        output = tempfile.SpooledTemporaryFile(max_size=NORMALIZE_MEMORY_BUDGET)
+        encoder = ENCODERS[audio_format](output, samplerate=out_rate, channels=1)
+        try:
+            for block in normalized_blocks(reader, out_rate=out_rate):
+                encoder.write(block.tobytes())
+        finally:
+            encoder.close()
+    finally:
+        reader.close()
+        source_bytes = fileobj.seek(0, 2)
+        fileobj.seek(0)
+    return NormalizedAudio(output, audio_format, source_bytes)
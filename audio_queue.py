@@ -0,0 +1,107 @@
+# audio_queue.py
+
+import asyncio
+import threading
+from collections import deque
+from audio_capture import SAMPLE_RATE, CHANNELS
+
+BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * 2  # int16 PCM
+
+# Audio older than this is dropped when the network can't keep up, so the live
+# transcript never drifts further behind the speaker
+LATENCY_BUDGET = 3.0  # Seconds
+MAX_EVENT_SECONDS = 0.5  # Largest audio event sent when catching up on a backlog
+
+# sounddevice status flags worth counting
+STATUS_FLAGS = ('input_overflow', 'input_underflow')
+
+
+class AudioQueue:
+    """
+    Bounded queue between the audio thread and the async sender.
+
+    The audio thread puts blocks without ever blocking. The sender gets everything that
+    is queued, coalesced into one chunk of at most max_bytes: a single block when it
+    keeps up, larger audio events when it has fallen behind. Anything beyond the
+    latency budget is dropped oldest-first. Queue depth, drops and sounddevice status
+    flags are counted.
+    """
+
+    def __init__(self, loop, latency_budget=LATENCY_BUDGET):
+        self._loop = loop
+        self._blocks = deque()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.max_queued_bytes = int(latency_budget * BYTES_PER_SECOND)
+        self.queued_bytes = 0
+        self.peak_queued_bytes = 0
+        self.blocks_in = 0
+        self.overruns = 0          # Blocks dropped because the latency budget was exceeded
+        self.dropped_bytes = 0
+        self.status_counts = {flag: 0 for flag in STATUS_FLAGS}
+
+    def put(self, block, status):
+        """
+        Capture consumer: called on the audio thread. A None block closes the queue.
+        """
+        with self._lock:
+            if block is None:
+                self._closed = True
+            else:
+                self.blocks_in += 1
+                self._blocks.append(block)
+                self.queued_bytes += len(block)
+                # Drop oldest beyond the latency budget
+                while self.queued_bytes > self.max_queued_bytes and len(self._blocks) > 1:
+                    dropped = self._blocks.popleft()
+                    self.queued_bytes -= len(dropped)
+                    self.dropped_bytes += len(dropped)
+                    self.overruns += 1
+                self.peak_queued_bytes = max(self.peak_queued_bytes, self.queued_bytes)
+            if status:
+                for flag in STATUS_FLAGS:
+                    if getattr(status, flag, False):
+                        self.status_counts[flag] += 1
+        self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def get(self, max_bytes=int(MAX_EVENT_SECONDS * BYTES_PER_SECOND)):
+        """
+        Waits for audio and returns all queued blocks, up to max_bytes, as one chunk.
+
+        Returns:
+            bytes: The coalesced audio, or None once the queue is closed and drained.
+        """
+        while True:
+            with self._lock:
+                if self._blocks:
+                    parts = [self._blocks.popleft()]
+                    size = len(parts[0])
+                    while self._blocks and size + len(self._blocks[0]) <= max_bytes:
+                        block = self._blocks.popleft()
+                        parts.append(block)
+                        size += len(block)
+                    self.queued_bytes -= size
+                    # A single block is passed on as its underlying bytes, without a copy
+                    return parts[0].obj if len(parts) == 1 else b''.join(parts)
+                if self._closed:
+                    return None
+                self._ready.clear()
+            await self._ready.wait()
+
+    def stats(self):
+        """
+        Returns the queue counters.
+
+        Returns:
+            dict: Current and peak backlog in seconds, blocks received, overruns, dropped seconds and status flag counts.
+        """
+        with self._lock:
+            return {
+                "backlog_seconds": self.queued_bytes / BYTES_PER_SECOND,
+                "peak_backlog_seconds": self.peak_queued_bytes / BYTES_PER_SECOND,
+                "blocks_in": self.blocks_in,
+                "overruns": self.overruns,
+                "dropped_seconds": self.dropped_bytes / BYTES_PER_SECOND,
+                "status_counts": dict(self.status_counts),
+            }
@@ -0,0 +1,252 @@
+# batch.py
+
+"""
+Processes a directory (or manifest) of recordings without the web UI:
+
+    python batch.py recordings/ --prefix batch/2024-11-20
+    python batch.py manifest.txt --transcribe-workers 20 --llm-workers 8
+
+Each file goes through the same pipeline as an upload (ingest, transcribe, clean,
+summarize, persist) into <prefix>/<file name>/. Files whose artifacts already exist
+there are skipped, so an interrupted batch can simply be run again.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from artifact_registry import ARTIFACT_FILES
+from pipeline import (
+    CleanStage, IngestStage, PersistStage, Pipeline, PipelineJob, PipelineStage, SummarizeStage, TranscribeStage
+)
+from segmented_transcription import audio_duration
+from storage import BucketWriter, get_s3_client, get_write_behind
+
+DEFAULT_BUCKET = 'ai.hadassah'
+AUDIO_EXTENSIONS = ('wav', 'mp3', 'flac')
+
+# Default per-stage concurrency
+INGEST_WORKERS = 4        # Decoding/resampling and multipart uploads
+TRANSCRIBE_WORKERS = 10   # Transcribe batch jobs running at once
+LLM_WORKERS = 4           # Files being cleaned or summarized at once
+
+
+class LimitedStage(PipelineStage):
+    """
+    Wraps a pipeline stage so only as many files as `slots` allows run it at once.
+    Its timing includes the wait for a slot.
+    """
+
+    def __init__(self, stage, slots):
+        self.stage = stage
+        self.name = stage.name
+        self.optional = stage.optional
+        self._slots = slots
+
+    def run(self, job, report):
+        with self._slots:
+            return self.stage.run(job, report)
+
+
+def batch_pipeline(ingest_workers, transcribe_workers, llm_workers):
+    """
+    The upload pipeline with a concurrency limit on each stage. Clean and summarize
+    share one limit, since both are bound by the same model quota.
+    """
+    llm_slots = threading.BoundedSemaphore(llm_workers)
+    return Pipeline([
+        LimitedStage(IngestStage(), threading.BoundedSemaphore(ingest_workers)),
+        LimitedStage(TranscribeStage(), threading.BoundedSemaphore(transcribe_workers)),
+        LimitedStage(CleanStage(), llm_slots),
+        LimitedStage(SummarizeStage(), llm_slots),
+        PersistStage(),
+    ])
+
+
+def read_inputs(source):
+    """
+    Lists the audio files to process: the audio files of a directory, or the paths
+    in a manifest (one per line; blank lines and '#' comments are ignored, relative
+    paths are relative to the manifest).
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.rsplit('.', 1)[-1].lower() in AUDIO_EXTENSIONS
+        )
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+
+def folder_for(prefix, path):
+    """
+    The S3 folder of a file: <prefix>/<file name without extension>, made key-safe.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    stem = re.sub(r'[^\w.-]+', '_', stem)
+    return f"{prefix.rstrip('/')}/{stem}" if prefix else stem
+
+
+def already_processed(bucket_name, folder_name):
+    """
+    True if every artifact of the folder is already in S3.
+    """
+    s3_client = get_s3_client()
+    for file_name in ARTIFACT_FILES:
+        try:
+            s3_client.head_object(Bucket=bucket_name, Key=f"{folder_name}/{file_name}")
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+    return True
+
+
+class FileResult:
+    """
+    Outcome of one file: 'done', 'skipped' or 'failed', with timings.
+    """
+    __slots__ = ('path', 'folder_name', 'status', 'error', 'seconds', 'audio_seconds', 'timings')
+
+    def __init__(self, path, folder_name):
+        self.path = path
+        self.folder_name = folder_name
+        self.status = None
+        self.error = None
+        self.seconds = 0.0
+        self.audio_seconds = None
+        self.timings = {}
+
+
+def process_file(pipeline, store, bucket_name, path, folder_name, split_long_files, resume):
+    """
+    Runs one file through the pipeline; never raises.
+    """
+    result = FileResult(path, folder_name)
+    started = time.monotonic()
+    try:
+        if resume and already_processed(bucket_name, folder_name):
+            result.status = 'skipped'
+            return result
+        audio_format = path.rsplit('.', 1)[-1].lower()
+        with open(path, 'rb') as audio:
+            result.audio_seconds = audio_duration(audio)
+            job = PipelineJob(
+                folder_name,
+                bucket_name,
+                store,
+                audio=audio,
+                audio_format=audio_format,
+                split_long_files=split_long_files
+            )
+            pipeline.run(job)
+        result.timings = job.timings
+        result.status = 'done'
+    except Exception as e:
+        result.status = 'failed'
+        result.error = e
+    finally:
+        result.seconds = time.monotonic() - started
+    return result
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_report(results, wall_seconds):
+    """
+    Prints the throughput and per-stage latency of a batch.
+    """
+    done = [r for r in results if r.status == 'done']
+    skipped = [r for r in results if r.status == 'skipped']
+    failed = [r for r in results if r.status == 'failed']
+    print()
+    print(f"Files: {len(done)} processed, {len(skipped)} skipped, {len(failed)} failed "
+          f"in {wall_seconds:.1f} s")
+    for r in failed:
+        print(f"  FAILED {r.path}: {r.error}")
+    if not done:
+        return
+
+    audio_seconds = sum(r.audio_seconds or 0.0 for r in done)
+    print(f"Throughput: {len(done) / wall_seconds * 60:.1f} files/min, "
+          f"{audio_seconds / wall_seconds:.1f} s of audio per second")
+
+    latencies = [r.seconds for r in done]
+    print(f"Per file: mean {statistics.mean(latencies):.1f} s, p50 {_percentile(latencies, 0.5):.1f} s, "
+          f"p95 {_percentile(latencies, 0.95):.1f} s")
+    stages = []
+    for r in done:
+        stages.extend(name for name in r.timings if name not in stages)
+    for name in stages:
+        times = [r.timings[name] for r in done if name in r.timings]
+        print(f"  {name:<11} mean {statistics.mean(times):7.1f} s   p50 {_percentile(times, 0.5):7.1f} s   "
+              f"p95 {_percentile(times, 0.95):7.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe, clean and summarize a batch of recordings.")
+    parser.add_argument('source', help="Directory of audio files, or a manifest listing one path per line")
+    parser.add_argument('--bucket', default=DEFAULT_BUCKET, help="S3 bucket (default: %(default)s)")
+    parser.add_argument('--prefix', default='batch', help="S3 prefix for the per-file folders (default: %(default)s)")
+    parser.add_argument('--ingest-workers', type=int, default=INGEST_WORKERS,
+                        help="Files normalized/uploaded at once (default: %(default)s)")
+    parser.add_argument('--transcribe-workers', type=int, default=TRANSCRIBE_WORKERS,
+                        help="Transcribe jobs at once (default: %(default)s)")
+    parser.add_argument('--llm-workers', type=int, default=LLM_WORKERS,
+                        help="Files cleaned/summarized at once (default: %(default)s)")
+    parser.add_argument('--split-long-files', action='store_true',
+                        help="Transcribe long files in parallel segments")
+    parser.add_argument('--no-resume', dest='resume', action='store_false',
+                        help="Reprocess files whose artifacts already exist")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    paths = read_inputs(args.source)
+    if not paths:
+        parser.error(f"No audio files found in {args.source}")
+
+    folders = [folder_for(args.prefix, path) for path in paths]
+    duplicates = sorted({folder for folder in folders if folders.count(folder) > 1})
+    if duplicates:
+        parser.error(f"Several files would share a folder: {', '.join(duplicates)}")
+
+    pipeline = batch_pipeline(args.ingest_workers, args.transcribe_workers, args.llm_workers)
+    # Artifacts are only written, never read back, so nothing is kept in memory
+    store = BucketWriter(args.bucket)
+    # Enough threads for every file to be in its busiest stage; the stage limits do the throttling
+    max_files = args.ingest_workers + args.transcribe_workers + args.llm_workers
+
+    started = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_files) as executor:
+        futures = [
+            executor.submit(process_file, pipeline, store, args.bucket, path,
+                            folder_name, args.split_long_files, args.resume)
+            for path, folder_name in zip(paths, folders)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(paths)}] {result.status:<7} {result.path} "
+                  f"-> s3://{args.bucket}/{result.folder_name} ({result.seconds:.1f} s)")
+    get_write_behind().flush()
+    print_report(results, time.monotonic() - started)
+    return 1 if any(r.status == 'failed' for r in results) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
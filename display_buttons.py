@@ -1,7 +1,8 @@
 # display_buttons.py
 
 import streamlit as st
-import boto3
+from artifact_registry import ARTIFACT_FILES
+from storage import get_s3_client
 
 def handle_display_buttons(folder_name, bucket_name):
     """
@@ -9,6 +10,10 @@ def handle_display_buttons(folder_name, bucket_name):
     and allows updating the visit summary.
     """
     if st.session_state.show_buttons:
+        # Fetch all three texts in the background so switching views doesn't wait on S3
+        artifact_store = st.session_state.artifact_store
+        artifact_store.prefetch([f"{folder_name}/{file_name}" for file_name in ARTIFACT_FILES])
+
         col1, col2, col3 = st.columns(3)
 
         # Flags to determine which text box to display
@@ -22,9 +27,7 @@ def handle_display_buttons(folder_name, bucket_name):
                 s3_raw_text_path = f"{folder_name}/raw.txt"
                 try:
                     with st.spinner('מעלה את התמלול המקורי...'):
-                        s3_client = boto3.client('s3', region_name='us-east-1')
-                        response = s3_client.get_object(Bucket=bucket_name, Key=s3_raw_text_path)
-                        raw_text_content = response['Body'].read().decode('utf-8')
+                        raw_text_content = artifact_store.get(s3_raw_text_path)
                         st.session_state.raw_text_content = raw_text_content  # Store in session
                         show_raw_text = True
                         st.session_state.show_update_summary = False  # Hide the Update Summary button
@@ -37,9 +40,7 @@ def handle_display_buttons(folder_name, bucket_name):
                 s3_clean_text_path = f"{folder_name}/clean.txt"
                 try:
                     with st.spinner('מעלה את התמלול המתוקן...'):
-                        s3_client = boto3.client('s3', region_name='us-east-1')
-                        response = s3_client.get_object(Bucket=bucket_name, Key=s3_clean_text_path)
-                        clean_text_content = response['Body'].read().decode('utf-8')
+                        clean_text_content = artifact_store.get(s3_clean_text_path)
                         st.session_state.clean_text_content = clean_text_content  # Store in session
                         show_clean_text = True
                         st.session_state.show_update_summary = False  # Hide the Update Summary button
@@ -52,9 +53,7 @@ def handle_display_buttons(folder_name, bucket_name):
                 s3_summary_text_path = f"{folder_name}/summary.txt"
                 try:
                     with st.spinner('מעלה את סיכום הביקור...'):
-                        s3_client = boto3.client('s3', region_name='us-east-1')
-                        response = s3_client.get_object(Bucket=bucket_name, Key=s3_summary_text_path)
-                        summary_text_content = response['Body'].read().decode('utf-8')
+                        summary_text_content = artifact_store.get(s3_summary_text_path)
                         st.session_state.summary_text_content = summary_text_content  # Store in session
                         show_summary_text = True
                         st.session_state.show_update_summary = True
@@ -107,13 +106,13 @@ def handle_display_buttons(folder_name, bucket_name):
                     # Upload the updated summary back to S3
                     s3_summary_text_path = f"{folder_name}/summary.txt"
                     with st.spinner('מעלה את סיכום הביקור החדש...'):
-                        s3_client = boto3.client('s3', region_name='us-east-1')
-                        s3_client.put_object(
+                        put_response = get_s3_client().put_object(
                             Bucket=bucket_name,
                             Key=s3_summary_text_path,
                             Body=new_summary,
                             ContentType='text/plain'
                         )
+                        artifact_store.put(s3_summary_text_path, new_summary, put_response['ETag'])
                     st.success("הסיכום עודכן בהצלחה.")  # "The summary was updated successfully."
 
                     # Update the session state with the new summary
@@ -0,0 +1,332 @@
+# job_queue.py
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+# Defaults, overridable with JOB_QUEUE_DB / JOB_SPOOL_DIR in the environment
+JOB_QUEUE_DB = 'jobs/queue.sqlite3'
+JOB_SPOOL_DIR = 'jobs/spool'        # Audio waiting for a worker; local to the machine running the workers
+
+JOB_LEASE_SECONDS = 60              # A running job whose worker stops renewing this long is handed out again
+JOB_MAX_ATTEMPTS = 3                # Claims before a job whose workers keep dying is failed
+JOB_RETENTION = 7 * 24 * 3600       # Seconds finished jobs stay queryable
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    folder_name TEXT NOT NULL,
+    bucket_name TEXT NOT NULL,
+    audio_path TEXT,
+    audio_format TEXT,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL,
+    preview TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT,
+    worker TEXT,
+    lease_until REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class QueuedJob:
+    """
+    A row of the job queue, as seen by the UI or a worker.
+    """
+    __slots__ = ('id', 'kind', 'folder_name', 'bucket_name', 'audio_path', 'audio_format', 'options',
+                 'status', 'stage', 'progress', 'preview', 'error', 'attempts', 'checkpoint', 'created', 'updated')
+
+    def __init__(self, row):
+        for name in self.__slots__:
+            setattr(self, name, row[name])
+        self.options = json.loads(row['options'])
+        self.checkpoint = json.loads(row['checkpoint']) if row['checkpoint'] else None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+
+class JobQueue:
+    """
+    Durable queue of pipeline jobs in a SQLite file, shared by the Streamlit server and
+    the worker processes.
+
+    The UI enqueues a job (its audio is spooled to disk, so no worker needs the browser
+    session) and polls its status. Workers claim jobs under a lease they keep renewing;
+    a job whose worker died is handed out again once the lease runs out, resuming from
+    its last checkpoint. Every call opens its own connection, so the queue can be used
+    from any thread or process.
+    """
+
+    def __init__(self, db_path=JOB_QUEUE_DB, spool_dir=JOB_SPOOL_DIR,
+                 lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        os.makedirs(spool_dir, exist_ok=True)
+        with self._connect() as connection:
+            # WAL lets the UI read statuses while a worker writes
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return _Connection(connection)
+
+    def enqueue(self, kind, folder_name, bucket_name, audio=None, audio_format=None, **options):
+        """
+        Adds a job to the queue.
+
+        Parameters:
+            kind (str): 'upload' or 'recording'.
+            folder_name (str): S3 prefix the results are written under.
+            bucket_name (str): The S3 bucket.
+            audio: Readable binary file object with the audio, copied to the spool
+                directory before this returns; None when there is no audio.
+            audio_format (str): 'wav', 'mp3' or 'flac'.
+            **options: JSON-serializable PipelineJob arguments (transcript, audio_hash,
+                split_long_files...).
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        audio_path = None
+        if audio is not None:
+            audio_path = os.path.join(self.spool_dir, f"{job_id}.{audio_format}")
+            audio.seek(0)
+            with open(audio_path, 'wb') as spooled:
+                shutil.copyfileobj(audio, spooled)
+            audio.seek(0)
+
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, folder_name, bucket_name, audio_path, audio_format, options,"
+                " status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, folder_name, bucket_name, audio_path, audio_format,
+                 json.dumps(options, ensure_ascii=False), now, now)
+            )
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns a job by ID, or None if it doesn't exist (or was pruned).
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return QueuedJob(row) if row is not None else None
+
+    def position(self, job_id):
+        """
+        Returns how many queued jobs are ahead of a queued job.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+                " AND created < (SELECT created FROM jobs WHERE id = ?)",
+                (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def claim(self, worker_name):
+        """
+        Hands the oldest waiting job to a worker: a queued job, or a running one whose
+        lease expired.
+
+        Returns:
+            QueuedJob: The claimed job, or None if there is nothing to do.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            # Idle workers ask often; only take the write lock when there is something to claim
+            waiting = connection.execute(
+                "SELECT 1 FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) LIMIT 1",
+                (now,)
+            ).fetchone()
+            if waiting is None:
+                return None
+            # Take the write lock up front so two workers can't claim the same job
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                lost = connection.execute(
+                    "SELECT id, audio_path FROM jobs WHERE status = 'running' AND lease_until < ?"
+                    " AND attempts >= ?",
+                    (now, self.max_attempts)
+                ).fetchall()
+                for row in lost:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated = ?"
+                        " WHERE id = ?",
+                        ("The worker stopped responding", now, row['id'])
+                    )
+
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+                    " ORDER BY created LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,"
+                        " lease_until = ?, updated = ? WHERE id = ?",
+                        (worker_name, now + self.lease_seconds, now, row['id'])
+                    )
+                    row = connection.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        for lost_row in lost:
+            self._remove_audio(lost_row['audio_path'])
+        return QueuedJob(row) if row is not None else None
+
+    def heartbeat(self, job_id, worker_name, stage=None, progress=None, preview=None, checkpoint=None, error=None):
+        """
+        Renews a running job's lease and records its progress.
+
+        Parameters:
+            job_id (str): The job.
+            worker_name (str): The worker holding it.
+            stage (str): The stage running now.
+            progress (float): Fraction (0-1) of the current stage, if it is known.
+            preview (str): Text the current stage has generated so far (clean, summarize).
+            checkpoint (dict): Resumable pipeline state; kept when None.
+            error (str): A non-fatal error to show (an optional stage failed); kept when None.
+
+        Returns:
+            bool: False if the job is no longer this worker's (its lease ran out and
+            another worker claimed it).
+        """
+        now = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_until = ?, stage = ?, progress = ?, preview = ?,"
+                " checkpoint = COALESCE(?, checkpoint), error = COALESCE(?, error), updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, stage, progress, preview,
+                 json.dumps(checkpoint, ensure_ascii=False) if checkpoint is not None else None,
+                 error, now, job_id, worker_name)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_name, checkpoint=None):
+        """
+        Marks a job done and drops its spooled audio.
+        """
+        self._finish(job_id, worker_name, 'done', None, checkpoint)
+
+    def fail(self, job_id, worker_name, stage, error, checkpoint=None):
+        """
+        Marks a job failed at a stage and drops its spooled audio.
+        """
+        self._finish(job_id, worker_name, 'failed', error, checkpoint, stage)
+
+    def _finish(self, job_id, worker_name, status, error, checkpoint, stage=None):
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT audio_path FROM jobs WHERE id = ? AND worker = ?", (job_id, worker_name)
+            ).fetchone()
+            connection.execute(
+                "UPDATE jobs SET status = ?, stage = COALESCE(?, stage), progress = NULL, preview = NULL,"
+                " error = COALESCE(?, error), checkpoint = COALESCE(?, checkpoint),"
+                " lease_until = NULL, updated = ? WHERE id = ? AND worker = ?",
+                (status, stage, error,
+                 json.dumps(checkpoint, ensure_ascii=False) if checkpoint is not None else None,
+                 now, job_id, worker_name)
+            )
+        if row is not None:
+            self._remove_audio(row['audio_path'])
+
+    def prune(self, retention=JOB_RETENTION):
+        """
+        Deletes finished jobs older than retention seconds.
+
+        Returns:
+            int: The number of jobs deleted.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                (time.time() - retention,)
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        """
+        Returns the number of jobs in each status.
+        """
+        with self._connect() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def _remove_audio(self, audio_path):
+        if audio_path:
+            try:
+                os.remove(audio_path)
+            except FileNotFoundError:
+                pass
+
+
+class _Connection:
+    """
+    Context manager that closes a sqlite3 connection (sqlite3's own only ends transactions).
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        return self._connection
+
+    def __exit__(self, *exc_info):
+        self._connection.close()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Returns the process-wide job queue, opening (and if needed creating) it on first use.
+
+    JOB_QUEUE_DB and JOB_SPOOL_DIR in the environment override where the queue and the
+    spooled audio are kept.
+
+    Returns:
+        JobQueue: The shared queue.
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                load_dotenv()
+                _job_queue = JobQueue(
+                    db_path=os.getenv('JOB_QUEUE_DB', JOB_QUEUE_DB),
+                    spool_dir=os.getenv('JOB_SPOOL_DIR', JOB_SPOOL_DIR)
+                )
+    return _job_queue
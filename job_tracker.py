@@ -0,0 +1,197 @@
+# job_tracker.py
+
+import random
+import threading
+import time
+from storage import get_transcribe_client
+
+# Adaptive polling schedule for batch transcription jobs
+POLL_INITIAL_INTERVAL = 1.0   # First checks are quick, short files finish fast
+POLL_BACKOFF_FACTOR = 1.5     # Each unfinished check waits longer than the last
+POLL_MAX_INTERVAL = 30.0      # Long jobs are checked at most this rarely
+POLL_JITTER = 0.2             # +/- 20% so jobs started together don't poll together
+THROTTLE_PAUSE = 5.0          # Extra pause for all jobs after a throttling error
+JOB_TIMEOUT = 600             # Seconds before a job is given up on
+FINISHED_RETENTION = 3600     # Seconds a finished job stays queryable
+
+FINAL_STATUSES = ('COMPLETED', 'FAILED')
+
+# get_transcription_job errors that end tracking instead of being retried
+PERMANENT_ERROR_CODES = ('BadRequestException', 'NotFoundException', 'AccessDeniedException')
+
+
+class TrackedJob:
+    """
+    A transcription job followed by the tracker. Sessions wait on it or poll its status.
+    """
+
+    def __init__(self, job_name, timeout):
+        self.job_name = job_name
+        self.status = 'IN_PROGRESS'  # IN_PROGRESS, COMPLETED, FAILED or TIMED_OUT
+        self.description = None      # Last get_transcription_job response
+        self.deadline = time.time() + timeout
+        self.finished_at = None
+        self.interval = POLL_INITIAL_INTERVAL
+        self.next_poll = time.time()
+        self.callbacks = []
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the job finishes or timeout seconds pass.
+
+        Returns:
+            bool: True if the job has finished.
+        """
+        return self._done.wait(timeout)
+
+
+class TranscriptionJobTracker:
+    """
+    Follows many Transcribe batch jobs from all sessions with a single background poller.
+
+    Each job is polled on its own adaptive schedule (fast at first, backing off with
+    jitter for long jobs), and sessions are notified through TrackedJob.wait or callbacks.
+    """
+
+    def __init__(self):
+        self.transcribe_client = get_transcribe_client()
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='transcribe-job-tracker', daemon=True)
+        self._thread.start()
+
+    def track(self, job_name, callback=None, timeout=JOB_TIMEOUT):
+        """
+        Starts following a job. Tracking the same job again returns the existing TrackedJob.
+
+        Parameters:
+            job_name (str): The Transcribe job name.
+            callback (callable): Called as callback(tracked_job) from the poller thread when the job finishes.
+            timeout (float): Seconds before the job is marked TIMED_OUT.
+
+        Returns:
+            TrackedJob: The tracked job.
+        """
+        with self._condition:
+            job = self._jobs.get(job_name)
+            if job is None:
+                job = TrackedJob(job_name, timeout)
+                self._jobs[job_name] = job
+                self._condition.notify()
+            if callback:
+                if job.done:
+                    callback(job)
+                else:
+                    job.callbacks.append(callback)
+            return job
+
+    def get(self, job_name):
+        """
+        Returns the TrackedJob for a job name, or None if it isn't tracked.
+        """
+        with self._condition:
+            return self._jobs.get(job_name)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._prune()
+                pending = [job for job in self._jobs.values() if not job.done]
+                now = time.time()
+                due = [job for job in pending if job.next_poll <= now]
+                if not due:
+                    next_poll = min((job.next_poll for job in pending), default=now + POLL_MAX_INTERVAL)
+                    self._condition.wait(max(0.0, next_poll - now))
+                    continue
+
+            for job in due:
+                self._poll(job)
+
+    def _poll(self, job):
+        try:
+            description = self.transcribe_client.get_transcription_job(TranscriptionJobName=job.job_name)
+        except Exception as e:
+            if _is_throttling(e):
+                # Back off every job, not just this one
+                with self._condition:
+                    for other in self._jobs.values():
+                        other.next_poll = max(other.next_poll, time.time() + THROTTLE_PAUSE)
+            else:
+                print(f"Polling transcription job {job.job_name} failed: {e}")
+                if _is_permanent(e):
+                    # The job doesn't exist or can't be queried; polling again won't change that
+                    self._finish(job, 'FAILED')
+                    return
+            if time.time() > job.deadline:
+                self._finish(job, 'TIMED_OUT')
+            else:
+                self._schedule(job)
+            return
+
+        job.description = description
+        status = description['TranscriptionJob']['TranscriptionJobStatus']
+        if status in FINAL_STATUSES:
+            self._finish(job, status)
+        elif time.time() > job.deadline:
+            self._finish(job, 'TIMED_OUT')
+        else:
+            self._schedule(job)
+
+    def _schedule(self, job):
+        jitter = 1 + random.uniform(-POLL_JITTER, POLL_JITTER)
+        job.next_poll = max(job.next_poll, time.time() + job.interval * jitter)
+        job.interval = min(job.interval * POLL_BACKOFF_FACTOR, POLL_MAX_INTERVAL)
+
+    def _finish(self, job, status):
+        with self._condition:
+            job.status = status
+            job.finished_at = time.time()
+            callbacks, job.callbacks = job.callbacks, []
+            job._done.set()
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Job callback for {job.job_name} failed: {e}")
+
+    def _prune(self):
+        # Caller holds the lock
+        cutoff = time.time() - FINISHED_RETENTION
+        for job_name in [name for name, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_name]
+
+
+def _error_code(error):
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code', '')
+
+
+def _is_throttling(error):
+    return 'Throttling' in _error_code(error) or 'Throttling' in type(error).__name__ or 'Throttling' in str(error)
+
+
+def _is_permanent(error):
+    """
+    True for errors that retrying won't fix: an unknown job name, a bad request, no access.
+    """
+    return _error_code(error) in PERMANENT_ERROR_CODES or type(error).__name__ in PERMANENT_ERROR_CODES
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_job_tracker():
+    """
+    Returns the process-wide job tracker, starting its poller on first use.
+    """
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = TranscriptionJobTracker()
+        return _tracker
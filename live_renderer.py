@@ -0,0 +1,39 @@
+# live_renderer.py
+
+import html
+import streamlit as st
+
+LIVE_RENDER_MAX_HZ = 5   # Maximum repaints per second of the live transcript
+LIVE_RENDER_HEIGHT = 300
+LIVE_TAIL_LINES = 40     # Final lines shown while recording; the full text is shown after stopping
+
+
+def _html_lines(text):
+    # Escape transcript text and keep it right-to-left
+    return (
+        "<div dir='rtl' style='text-align: right; white-space: pre-wrap;'>"
+        f"{html.escape(text)}</div>"
+    )
+
+
+def render_live_transcript(store, max_lines=LIVE_TAIL_LINES):
+    """
+    Paints the tail of a TranscriptStore (its last final lines plus the partial line).
+
+    Meant to be called from a fragment that reruns at LIVE_RENDER_MAX_HZ: all transcript
+    events between two reruns are coalesced into one repaint, and only a bounded tail
+    is sent to the browser no matter how long the visit gets. Each rerun repaints even
+    if nothing changed, since a fragment drops the elements it doesn't draw again.
+
+    Parameters:
+        store (TranscriptStore): The live transcript, filled by the streaming session.
+        max_lines (int): Number of final lines to show.
+    """
+    # Snapshot without locking: the list is only ever appended to
+    lines = [segment.line() for segment in store.segments[-max_lines:]]
+    partial = store.partial
+    if partial is not None:
+        lines.append(partial.line())
+
+    box = st.container(height=LIVE_RENDER_HEIGHT)
+    box.markdown(_html_lines('\n'.join(lines)), unsafe_allow_html=True)
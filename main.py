@@ -1,7 +1,6 @@
 # main.py
 
 import streamlit as st
-import io
 from datetime import datetime
 import boto3
 
@@ -9,6 +8,9 @@ import boto3
 from recording import handle_recording
 from uploader import handle_uploader
 from display_buttons import handle_display_buttons
+from ai_agent import warm_up_bedrock
+from artifact_store import ArtifactStore
+from worker import start_worker_pool
 
 # =============================================
 # 1. Set Page Configuration First
@@ -20,14 +22,28 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Pre-warm the shared Bedrock client once per server process
+@st.cache_resource
+def init_ai_agent():
+    return warm_up_bedrock()
+
+init_ai_agent()
+
+# Worker processes serving the job queue, started once per server process
+@st.cache_resource
+def init_worker_pool():
+    return start_worker_pool()
+
+init_worker_pool()
+
 # =============================================
 # 2. Initialize Session State Variables
 # =============================================
-if "audio_buffer" not in st.session_state:
-    st.session_state.audio_buffer = io.BytesIO()
+if "recording_sink" not in st.session_state:
+    st.session_state.recording_sink = None
 
-if "transcription_text" not in st.session_state:
-    st.session_state.transcription_text = ""
+if "transcript_store" not in st.session_state:
+    st.session_state.transcript_store = None
 
 if "show_buttons" not in st.session_state:
     st.session_state.show_buttons = False
@@ -61,6 +77,10 @@ bucket_name = 'ai.hadassah'
 folder_name = f"{timestamp}"
 file_name = 'raw.txt'
 
+# Raw/clean/summary texts of this session, seeded by the pipeline and read by the views
+if "artifact_store" not in st.session_state:
+    st.session_state.artifact_store = ArtifactStore(bucket_name)
+
 # Initialize the S3 client with the correct region
 s3_client = boto3.client('s3', region_name='us-east-1')  # Ensure this matches your S3 bucket's region
 
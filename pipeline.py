@@ -0,0 +1,348 @@
+# pipeline.py
+
+import abc
+import time
+import uuid
+from ai_agent import ai_agent_clean_stream, ai_agent_summary_stream
+from artifact_registry import get_artifact_registry, hash_audio
+from audio_normalize import normalize_audio
+from job_tracker import get_job_tracker
+from segmented_transcription import SEGMENT_MIN_FILE_SECONDS, SegmentedTranscription, audio_duration
+from storage import get_transcribe_client, open_object, upload_audio
+from transcript_parser import iter_transcript_words, words_to_turns
+
+TRANSCRIBE_LANGUAGE = 'he-IL'      # Hebrew language code
+MAX_SPEAKER_LABELS = 2             # Adjust the number of speakers as needed
+SEGMENT_PROGRESS_SECONDS = 1.0     # How often a segmented transcription reports its progress
+
+# Artifact written by each stage, and the PipelineJob attribute holding its text
+STAGE_ARTIFACTS = {
+    'transcribe': ('raw.txt', 'transcript'),
+    'clean': ('clean.txt', 'clean_text'),
+    'summarize': ('summary.txt', 'summary_text'),
+}
+
+AUDIO_CONTENT_TYPES = {
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+    'flac': 'audio/flac',
+}
+
+
+class PipelineError(Exception):
+    """
+    A stage failed; the original exception is the __cause__.
+    """
+
+    def __init__(self, stage, cause):
+        super().__init__(f"{stage}: {cause}")
+        self.stage = stage
+
+
+class PipelineJob:
+    """
+    The state of one recording going through the pipeline: inputs, what each stage
+    produced so far, the pending S3 writes and per-stage timings.
+
+    Parameters:
+        folder_name (str): S3 prefix for everything produced.
+        bucket_name (str): The S3 bucket.
+        store: Where artifacts are saved; anything with save(key, text) -> Future,
+            such as a BucketWriter.
+        audio: Readable, seekable audio file object, or None when there is no audio.
+        audio_format (str): 'wav', 'mp3' or 'flac'.
+        audio_basename (str): S3 object name of the audio, without extension.
+        transcript (str): A transcript that already exists (live recording); the
+            transcribe stage then only saves it.
+        audio_hash (str): Content hash of the audio, if already known.
+        split_long_files (bool): Transcribe long audio in parallel segments.
+    """
+
+    def __init__(self, folder_name, bucket_name, store, audio=None, audio_format=None,
+                 audio_basename='audio', transcript=None, audio_hash=None, split_long_files=False):
+        self.folder_name = folder_name
+        self.bucket_name = bucket_name
+        self.store = store
+        self.audio = audio
+        self.audio_format = audio_format
+        self.audio_basename = audio_basename
+        self.audio_hash = audio_hash
+        self.split_long_files = split_long_files
+
+        self.audio_key = None          # S3 key of the uploaded audio
+        self.segmented = False         # Transcribed as parallel segments
+        self.transcription_job = None  # Name of the batch job, once started
+        self.transcript = transcript
+        self.clean_text = None
+        self.summary_text = None
+        self.restored = False          # Artifacts were copied from an earlier identical upload
+
+        self.completed = []            # Names of the finished stages
+        self.timings = {}              # Stage name -> seconds spent in it
+        self.writes = []               # Futures of the artifact writes
+
+    def key(self, file_name):
+        return f"{self.folder_name}/{file_name}"
+
+    def save(self, file_name, text):
+        """
+        Hands an artifact to the store (written to S3 in the background).
+        """
+        self.writes.append(self.store.save(self.key(file_name), text))
+
+
+class PipelineStage(abc.ABC):
+    """
+    One step of the pipeline.
+
+    run(job, report) reads what earlier stages left on the job and records its own
+    output there; report(stage, event, data) publishes progress. An optional stage
+    that fails is reported and skipped instead of stopping the pipeline.
+    """
+    name = None
+    optional = False
+
+    @abc.abstractmethod
+    def run(self, job, report):
+        """
+        Advances the job by this stage; see the class docstring.
+        """
+
+
+class IngestStage(PipelineStage):
+    """
+    Short-circuits audio that was already processed, otherwise normalizes it to 16 kHz
+    mono and uploads it.
+    """
+    name = 'ingest'
+
+    def __init__(self, normalize=True, use_registry=True, optional=False):
+        self.normalize = normalize
+        self.use_registry = use_registry
+        self.optional = optional
+
+    def run(self, job, report):
+        if job.audio is None:
+            return
+
+        if self.use_registry:
+            if job.audio_hash is None:
+                job.audio_hash = hash_audio(job.audio)
+            registry = get_artifact_registry(job.bucket_name)
+            record = registry.lookup(job.audio_hash)
+            if record is not None:
+                registry.restore(record, job.folder_name)
+                job.restored = True
+                report(self.name, 'restored', record)
+                return
+
+        # Long files are cut and uploaded segment by segment by the transcribe stage
+        if job.split_long_files and (audio_duration(job.audio) or 0) > SEGMENT_MIN_FILE_SECONDS:
+            job.segmented = True
+            job.audio_key = job.key('segments/')
+            return
+
+        audio_file = job.audio
+        audio_format = job.audio_format
+        normalized = normalize_audio(job.audio) if self.normalize else None
+        if normalized is not None:
+            audio_file = normalized.fileobj
+            audio_format = normalized.file_extension
+        job.audio_format = audio_format
+        job.audio_key = job.key(f"{job.audio_basename}.{audio_format}")
+        try:
+            upload_audio(
+                audio_file,
+                job.bucket_name,
+                job.audio_key,
+                AUDIO_CONTENT_TYPES[audio_format],
+                on_progress=lambda sent, total: report(self.name, 'upload', (sent, total))
+            )
+        finally:
+            if normalized is not None:
+                normalized.fileobj.close()
+        report(self.name, 'uploaded', job.audio_key)
+
+
+class TranscribeStage(PipelineStage):
+    """
+    Produces the speaker-attributed transcript with Transcribe (one batch job, or
+    parallel segments) and saves it as raw.txt. A transcript that is already on the
+    job is only saved.
+    """
+    name = 'transcribe'
+
+    def run(self, job, report):
+        if job.restored:
+            return
+        if job.transcript is None:
+            if job.segmented:
+                job.transcript = self._wait_segmented(job, report)
+            else:
+                job.transcript = self._wait_batch(job)
+        if not job.transcript:
+            raise ValueError("The transcript is empty")
+        job.save('raw.txt', job.transcript)
+
+    def _wait_batch(self, job):
+        if job.transcription_job is None:
+            job.transcription_job = f"transcription_{uuid.uuid4()}"
+            # Shared, since batch runs start jobs from several threads at once
+            get_transcribe_client().start_transcription_job(
+                TranscriptionJobName=job.transcription_job,
+                Media={'MediaFileUri': f"s3://{job.bucket_name}/{job.audio_key}"},
+                MediaFormat=job.audio_format,
+                # Transcribe writes the result straight into the job's folder
+                OutputBucketName=job.bucket_name,
+                OutputKey=job.key('transcribe.json'),
+                LanguageCode=TRANSCRIBE_LANGUAGE,
+                Settings={
+                    'ShowSpeakerLabels': True,  # Enable speaker identification
+                    'MaxSpeakerLabels': MAX_SPEAKER_LABELS
+                }
+            )
+
+        # The shared tracker polls the job; we only wait on it
+        tracked_job = get_job_tracker().track(job.transcription_job)
+        tracked_job.wait()
+        if tracked_job.status != 'COMPLETED':
+            raise RuntimeError(f"Transcription job ended with status {tracked_job.status}")
+
+        # Parse the result as it streams from the bucket, one item at a time
+        transcript_body = open_object(job.bucket_name, job.key('transcribe.json'))
+        try:
+            return words_to_turns(iter_transcript_words(transcript_body))
+        finally:
+            transcript_body.close()
+
+    def _wait_segmented(self, job, report):
+        transcription = SegmentedTranscription(
+            job.audio, job.bucket_name, job.folder_name, TRANSCRIBE_LANGUAGE, MAX_SPEAKER_LABELS
+        ).start()
+        while not transcription.wait(SEGMENT_PROGRESS_SECONDS):
+            if transcription.segment_count:
+                report(self.name, 'segments', (transcription.segments_done, transcription.segment_count))
+        if transcription.error is not None:
+            raise transcription.error
+        return transcription.text
+
+
+class CleanStage(PipelineStage):
+    """
+    Cleans the transcript with the language model, reporting the text as it streams.
+    """
+    name = 'clean'
+
+    def run(self, job, report):
+        if job.restored:
+            return
+        pieces = []
+        for piece in ai_agent_clean_stream(job.transcript):
+            pieces.append(piece)
+            report(self.name, 'text', piece)
+        job.clean_text = ''.join(pieces)
+        job.save('clean.txt', job.clean_text)
+
+
+class SummarizeStage(PipelineStage):
+    """
+    Summarizes the cleaned transcript, reporting the text as it streams.
+    """
+    name = 'summarize'
+
+    def run(self, job, report):
+        if job.restored:
+            return
+        pieces = []
+        for piece in ai_agent_summary_stream(job.clean_text):
+            pieces.append(piece)
+            report(self.name, 'text', piece)
+        job.summary_text = ''.join(pieces)
+        job.save('summary.txt', job.summary_text)
+
+
+class PersistStage(PipelineStage):
+    """
+    Waits until every artifact is in S3, then records the audio in the artifact
+    registry so it is never processed again. Only audio with a real clean text and
+    summary is registered; anything less would be restored on every later upload.
+    """
+    name = 'persist'
+
+    def __init__(self, use_registry=True):
+        self.use_registry = use_registry
+
+    def run(self, job, report):
+        for write in job.writes:
+            write.result()
+        if not self.use_registry or job.audio_hash is None or job.restored:
+            return
+        if not job.clean_text or not job.summary_text:
+            raise ValueError("The clean text or the summary is missing; the audio is not registered")
+        get_artifact_registry(job.bucket_name).register(job.audio_hash, job.folder_name, job.audio_key)
+
+
+class Pipeline:
+    """
+    Runs stages in order over a PipelineJob, without any UI.
+
+    Stages that finished are recorded on the job, so a restart with the same job
+    (e.g. restored from a checkpoint) resumes at the first unfinished stage.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def run(self, job, on_progress=None):
+        """
+        Runs the remaining stages.
+
+        Parameters:
+            job (PipelineJob): The job to advance.
+            on_progress (callable): Called as on_progress(stage, event, data); events are
+                'start', 'done' (data: seconds), 'error' (optional stages) and the
+                stage-specific ones ('upload', 'uploaded', 'restored', 'segments', 'text').
+
+        Returns:
+            PipelineJob: The job.
+
+        Raises:
+            PipelineError: A required stage failed.
+        """
+        report = on_progress or (lambda stage, event, data=None: None)
+        for stage in self.stages:
+            if stage.name in job.completed:
+                continue
+            report(stage.name, 'start', None)
+            started = time.monotonic()
+            try:
+                stage.run(job, report)
+            except Exception as e:
+                if not stage.optional:
+                    raise PipelineError(stage.name, e) from e
+                report(stage.name, 'error', e)
+            elapsed = job.timings.get(stage.name, 0.0) + time.monotonic() - started
+            job.timings[stage.name] = elapsed
+            job.completed.append(stage.name)
+            report(stage.name, 'done', elapsed)
+        return job
+
+
+def upload_pipeline():
+    """
+    Pipeline for uploaded files: ingest (with dedup and normalization), batch
+    transcription, clean, summarize, persist.
+    """
+    return Pipeline([IngestStage(), TranscribeStage(), CleanStage(), SummarizeStage(), PersistStage()])
+
+
+def recording_pipeline(audio_only=False):
+    """
+    Pipeline for live recordings: the transcript already exists, and a failed audio
+    upload doesn't stop the texts from being produced. With audio_only (nothing was
+    transcribed) the recording is just uploaded.
+    """
+    ingest = IngestStage(normalize=False, use_registry=False, optional=True)
+    if audio_only:
+        return Pipeline([ingest])
+    return Pipeline([ingest, TranscribeStage(), CleanStage(), SummarizeStage(), PersistStage(use_registry=False)])
@@ -0,0 +1,128 @@
+# pipeline_progress.py
+
+import streamlit as st
+from job_queue import get_job_queue
+from pipeline import STAGE_ARTIFACTS
+
+# How often the page checks a queued job: rarely while it waits or transcribes, often
+# while the model streams text
+JOB_STATUS_POLL_SECONDS = 1
+JOB_STREAM_POLL_SECONDS = 0.25
+STREAMING_STAGES = ('clean', 'summarize')
+
+# Shown while a stage runs
+STAGE_MESSAGES = {
+    'ingest': 'מעלה את הקובץ ל-S3...',                 # "Uploading the file to S3..."
+    'transcribe': 'מתחיל תמלול הקובץ. נא המתינו...',   # "Starting transcription. Please wait..."
+    'clean': 'מנקה את התמלול...',                      # "Cleaning the transcription..."
+    'summarize': 'סוכם את התמלול...',                   # "Summarizing the transcription..."
+    'persist': 'שומר את התוצאות ב-S3...',              # "Saving the results to S3..."
+}
+
+# Shown when a pipeline stage fails
+STAGE_ERRORS = {
+    'ingest': "העלאת הקובץ נכשלה",  # "File upload failed"
+    'transcribe': "טעינת התמלול הגולמי נכשלה",  # "Uploading raw transcription failed"
+    'clean': "ניקוי התמלול נכשל",  # "Cleaning transcription failed"
+    'summarize': "סיכום התמלול נכשל",  # "Summarizing transcription failed"
+    'persist': "שמירת התוצאות ב-S3 נכשלה",  # "Saving the results to S3 failed"
+}
+
+
+def queued_job_view(state_key):
+    """
+    Follows the queued job whose ID is in st.session_state[state_key], showing its
+    place in the queue, the running stage and the text generated so far.
+
+    The polling fragment only runs while there is a job. When the job is done the key
+    is cleared, the session's artifact store is filled with the final texts, and the
+    whole app reruns with the result buttons shown. The work itself runs in a worker
+    process, so closing the page or rerunning doesn't stop it.
+    """
+    error = st.session_state.pop(f"{state_key}_error", None)
+    if error:
+        st.error(error)
+    job_id = st.session_state.get(state_key)
+    if job_id is None:
+        return
+    job = get_job_queue().get(job_id)
+    if job is not None and _is_streaming(job):
+        _follow_streaming_job(state_key)
+    else:
+        _follow_job(state_key)
+
+
+def _is_streaming(job):
+    return job.status == 'running' and job.stage in STREAMING_STAGES
+
+
+@st.fragment(run_every=JOB_STATUS_POLL_SECONDS)
+def _follow_job(state_key):
+    _render_job(state_key, streaming=False)
+
+
+@st.fragment(run_every=JOB_STREAM_POLL_SECONDS)
+def _follow_streaming_job(state_key):
+    _render_job(state_key, streaming=True)
+
+
+def _render_job(state_key, streaming):
+    job_id = st.session_state.get(state_key)
+    if job_id is None:
+        return
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        _finish_with_error(state_key, "העבודה לא נמצאה בתור העיבוד.")  # "The job was not found in the processing queue."
+    if _is_streaming(job) != streaming:
+        # Switch to the other polling rate
+        st.rerun()
+
+    if job.status == 'queued':
+        # "Waiting in the processing queue ({ahead} jobs ahead)..."
+        st.info(f"ממתין בתור העיבוד ({job_queue.position(job_id)} עבודות לפניך)...")
+    elif job.status == 'running':
+        st.info(STAGE_MESSAGES.get(job.stage, job.stage or ''))
+        if job.progress is not None:
+            st.progress(job.progress)
+        if job.preview:
+            # The text of the clean/summarize stage as the worker generates it
+            st.markdown(job.preview)
+    elif job.status == 'failed':
+        _finish_with_error(state_key, f"{STAGE_ERRORS.get(job.stage, 'העיבוד נכשל')}: {job.error}")  # "Processing failed"
+    else:
+        st.session_state.pop(state_key, None)
+        _cache_artifacts(job)
+        if job.error:
+            st.toast(f"השלב נכשל: {job.error}")  # "A stage failed: {error}"
+        st.toast("התמלול מוכן - כעת ניתן להציג את סיכום שיחה")  # "Transcription is ready - you can now view the conversation summary"
+        st.session_state.show_buttons = True
+        st.rerun()
+
+
+def _finish_with_error(state_key, message):
+    """
+    Stops following the job and shows the message on the next (full) run, so it stays
+    on the page instead of vanishing with the fragment.
+    """
+    st.session_state.pop(state_key, None)
+    st.session_state[f"{state_key}_error"] = message
+    st.rerun()
+
+
+def _cache_artifacts(job):
+    """
+    Seeds the session's artifact store with the texts the worker produced, with their
+    ETags, so viewing them costs no download. Artifacts the worker didn't produce (they
+    were restored from an earlier upload) are dropped from the cache instead.
+    """
+    store = st.session_state.artifact_store
+    checkpoint = job.checkpoint or {}
+    etags = checkpoint.get('etags', {})
+    for file_name, attribute in STAGE_ARTIFACTS.values():
+        key = f"{job.folder_name}/{file_name}"
+        text = checkpoint.get(attribute)
+        if text and not checkpoint.get('restored'):
+            store.put(key, text, etags.get(key))
+        else:
+            store.invalidate([key])
@@ -1,15 +1,41 @@
 # recording.py
 
 import streamlit as st
-import asyncio
-from amazon_transcribe.client import TranscribeStreamingClient
-from handlers import TranscriptResultStreamHandler  # Ensure absolute import
-import sounddevice as sd
-import threading
-import boto3
-import io
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import requests
-from ai_agent import ai_agent_clean, ai_agent_summary  # Correct import based on file name
+from job_queue import get_job_queue
+from pipeline_progress import queued_job_view
+from audio_capture import AudioCapture, LevelMeter
+from recording_sink import RecordingSink
+from live_renderer import LIVE_RENDER_MAX_HZ, render_live_transcript
+from streaming_session import start_streaming_session, get_streaming_session, stop_streaming_session
+
+def _session_key():
+    """
+    Returns the key of the current browser session in the streaming session registry.
+    """
+    return get_script_run_ctx().session_id
+
+@st.fragment(run_every=1 / LIVE_RENDER_MAX_HZ)
+def live_transcript_view(session_key):
+    """
+    Shows the live transcript of the background streaming session, refreshed at a bounded rate.
+    """
+    session = get_streaming_session(session_key)
+    if session is None:
+        return
+    if session.error is not None:
+        # "Live transcription failed: {error}. The recording continues."
+        st.error(f"התמלול החי נכשל: {session.error}. ההקלטה ממשיכה.")
+    level_meter = st.session_state.get('level_meter')
+    if level_meter is not None:
+        st.progress(min(1.0, level_meter.rms * 5))  # Microphone level
+    stats = session.stats()
+    if stats and stats['overruns']:
+        # "Network is slow: {seconds} seconds of audio were skipped"
+        st.caption(f"החיבור איטי: {stats['dropped_seconds']:.1f} שניות שמע לא נשלחו לתמלול")
+    render_live_transcript(session.store)
+
 
 def handle_recording(folder_name, bucket_name):
     """
@@ -23,13 +49,17 @@ def handle_recording(folder_name, bucket_name):
         if start_button_clicked:
             st.session_state.recording = True
             st.markdown("<div class='status-message'>מתחיל הקלטה ותמלול - אפשר להתחיל לדבר.</div>", unsafe_allow_html=True)
-            # Define the transcription placeholder below the buttons
-            transcription_placeholder = st.empty()
-            # Run the transcription asynchronously
-            handler = asyncio.run(basic_transcribe(transcription_placeholder))
+
+            # One microphone capture feeds both the archive and live transcription
+            capture = AudioCapture()
+            st.session_state.level_meter = capture.subscribe(LevelMeter())
 
             # Start silent recording
-            start_recording()
+            start_recording(capture)
+
+            # Run the transcription in a background session, so this rerun returns right away
+            session = start_streaming_session(_session_key(), capture)
+            st.session_state.transcript_store = session.store
             st.write("ההקלטה החלה")  # "Recording started"
 
     with record_col1:
@@ -38,19 +68,58 @@ def handle_recording(folder_name, bucket_name):
             st.session_state.recording = False
             st.markdown("<p style='direction: rtl; text-align: right;'>התמלול הופסק.</p>", unsafe_allow_html=True)  # "Transcription stopped."
 
-            # Stop recording and upload the audio
-            stop_recording_and_upload(folder_name, bucket_name)
+            # Stop the streaming session; it delivers the last results before returning
+            with st.spinner('מסיים את התמלול...'):
+                stop_streaming_session(_session_key())
+
+            # Stop recording; the audio is uploaded while the transcription is processed
+            sink = stop_recording()
 
             # Process the transcription
-            process_transcription(folder_name, bucket_name)
+            process_transcription(folder_name, bucket_name, sink)
+
+    # Live transcript below the buttons while recording
+    if st.session_state.recording:
+        live_transcript_view(_session_key())
 
+    # Follow the queued processing of the last recording
+    queued_job_view('recording_job')
 
-def process_transcription(folder_name, bucket_name):
+
+def process_transcription(folder_name, bucket_name, sink=None):
     """
-    Processes the transcription by displaying raw text, cleaning, summarizing, and uploading to S3.
+    Queues the transcription for processing (upload, cleaning, summarizing and saving to
+    S3 run in a worker process) and displays the raw text.
+
+    Parameters:
+        sink (RecordingSink): The finished recording, copied into the job queue; closed afterwards.
     """
-    raw_text = st.session_state.transcription_text
+    store = st.session_state.get('transcript_store')
+    raw_text = store.render(include_partial=False) if store is not None else ""
+
+    audio = None
+    try:
+        if sink is not None:
+            try:
+                audio = sink.finish()  # Spooled from the sink's memory/temp file
+            except Exception as e:
+                # The texts are still processed, without the archived audio
+                st.error(f"שמירת ההקלטה נכשלה: {e}")  # "Saving the recording failed: {e}"
+        job_id = get_job_queue().enqueue(
+            'recording',
+            folder_name,
+            bucket_name,
+            audio=audio,
+            audio_format=sink.file_extension if audio is not None else None,
+            transcript=raw_text
+        )
+    finally:
+        # Release the recording
+        if sink is not None:
+            sink.close()
+
     if not raw_text:
+        # The recording is still uploaded, but there is nothing to follow
         st.error("אין תמלול זמין לעיבוד.")  # "No transcription available for processing."
         return
 
@@ -63,203 +132,30 @@ def process_transcription(folder_name, bucket_name):
         disabled=True
     )
     st.success("מבצע טעינת נתונים - נא המתינו להשלמת שלושת השלבים")
-
-    # Define S3 keys
-    raw_text_key = f"{folder_name}/raw.txt"
-    clean_text_key = f"{folder_name}/clean.txt"
-    summary_text_key = f"{folder_name}/summary.txt"
-
-    # Upload raw text to S3
-    try:
-        s3_client = boto3.client('s3', region_name='us-east-1')
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=raw_text_key,
-            Body=raw_text,
-            ContentType='text/plain'
-        )
-        st.write(f"S3 Path: {raw_text_key}")
-        st.write("שלב 1 הושלם בהצלחה")  # "Step 1 completed successfully"
-    except Exception as e:
-        st.error(f"טעינת התמלול הגולמי נכשלה: {e}")  # "Uploading raw transcription failed: {error}"
-        return
-
-    # Clean the transcription
-    try:
-        with st.spinner('מנקה את התמלול...'):
-            clean_text = ai_agent_clean(raw_text)
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=clean_text_key,
-            Body=clean_text,
-            ContentType='text/plain'
-        )
-        st.write(f"Clean Text S3 Path: {clean_text_key}")
-        st.write("שלב 2 הושלם בהצלחה")  # "Step 2 completed successfully"
-    except Exception as e:
-        st.error(f"ניקוי התמלול נכשל: {e}")  # "Cleaning transcription failed: {error}"
-        return
-
-    # Summarize the transcription
-    try:
-        with st.spinner('מסכם את התמלול...'):
-            summary_text = ai_agent_summary(clean_text)
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=summary_text_key,
-            Body=summary_text,
-            ContentType='text/plain'
-        )
-        st.write(f"Summary Text S3 Path: {summary_text_key}")
-        st.write("שלב 3 הושלם בהצלחה")  # "Step 3 completed successfully"
-    except Exception as e:
-        st.error(f"סיכום התמלול נכשל: {e}")  # "Summarizing transcription failed: {error}"
-        return
-
-    # Final success message
-    st.success("התמלול מוכן - כעת ניתן להציג את סיכום שיחה")  # "Transcription is ready - you can now view the conversation summary"
     st.markdown("<div class='status-message'>ההקלטה הסתיימה</div>", unsafe_allow_html=True)
 
-    # Show buttons after processing
-    st.session_state.show_buttons = True
+    # queued_job_view shows the buttons once the worker is done
+    st.session_state.recording_job = job_id
 
-def start_recording():
+def start_recording(capture):
     """
-    Starts recording audio in a separate thread and saves it to session state.
+    Archives the captured audio into a bounded recording sink, from the same
+    capture that feeds live transcription.
     """
     st.session_state.recording = True
-    # Start recording in a separate thread
-    def record():
-        with sd.InputStream(samplerate=16000, channels=1, dtype='int16') as stream:
-            while st.session_state.recording:
-                data, _ = stream.read(1024)
-                st.session_state.audio_buffer.write(data.tobytes())
-    threading.Thread(target=record, daemon=True).start()
+    st.session_state.recording_sink = capture.subscribe(RecordingSink())
 
-def stop_recording_and_upload(folder_name, bucket_name):
+def stop_recording():
     """
-    Stops the recording, uploads the audio to S3, and resets the buffer.
+    Stops the recording and hands over its sink, which has already encoded the audio
+    (FLAC or WAV) as it was captured.
+
+    Returns:
+        RecordingSink | None: The finished recording, if one was running.
     """
     st.session_state.recording = False
-    # Convert the recorded bytes to MP3 (requires additional processing if needed)
-    audio_data = st.session_state.audio_buffer.getvalue()
-    s3_record = f"{folder_name}/record.mp3"
-    try:
-        with st.spinner('מעלה את ההקלטה ל-S3...'):
-            s3_client = boto3.client('s3', region_name='us-east-1')
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=s3_record,
-                Body=audio_data,
-                ContentType='audio/mpeg'
-            )
-        st.success("ההקלטה הועלתה בהצלחה ל-S3.")  # "Audio recorded and uploaded to S3 successfully."
-    except Exception as e:
-        st.error(f"לא ניתן להעלות את ההקלטה: {e}")  # "Could not upload audio: {error}"
-    # Reset the buffer
-    st.session_state.audio_buffer = io.BytesIO()
-
-# Event handler class
-class MyEventHandler(TranscriptResultStreamHandler):
-    def __init__(self, stream, transcription_display):
-        super().__init__(stream)
-        self.transcription_display = transcription_display
-        self.transcription_accum = ""
-        self.event_count = 0
-        self.stop_transcription = False
-
-    async def handle_transcript_event(self, transcript_event):
-        if self.stop_transcription:
-            return
-
-        results = transcript_event.transcript.results
-        self.event_count += 1
-        for result in results:
-            speaker = None
-            if result.alternatives[0].items[0].speaker is not None:
-                speaker = f"דובר {result.alternatives[0].items[0].speaker}: "  # Hebrew "Speaker"
-                # speaker = f"{result.alternatives[0].items[0].speaker}: "  # Hebrew "Speaker"
-
-            if len(result.alternatives) > 0:
-                transcript = result.alternatives[0].transcript
-                full_transcript = f"{speaker}{transcript}" if speaker else transcript
-
-                # Check if this is a partial result or a final result
-                if not result.is_partial:
-                    # For final results, append the full transcript
-                    self.transcription_accum += full_transcript + "\n"
-                    self.transcription_display.text_area(
-                        "תמלול:",
-                        self.transcription_accum,
-                        height=300,
-                        key=f"live_{self.event_count}"
-                    )
-                    # Store the accumulated transcription in session state
-                    st.session_state.transcription_text = self.transcription_accum
-                else:
-                    # For partial results, update the last line
-                    lines = self.transcription_accum.split('\n')
-                    if lines[-1].strip():  # If the last line is not empty
-                        lines[-1] = full_transcript
-                    else:
-                        lines.append(full_transcript)
-
-                    self.transcription_show = '\n'.join(lines)
-
-                    # Update transcription display in Streamlit
-                    self.transcription_display.text_area(
-                        "תמלול:",
-                        self.transcription_show,
-                        height=300,
-                        key=f"live_{self.event_count}"
-                    )
-
-async def mic_stream():
-    loop = asyncio.get_event_loop()
-    input_queue = asyncio.Queue()
-
-    def callback(indata, frame_count, time_info, status):
-        loop.call_soon_threadsafe(input_queue.put_nowait, (bytes(indata), status))
-
-    stream = sd.RawInputStream(
-        channels=1,
-        samplerate=16000,
-        callback=callback,
-        blocksize=1024 * 2,
-        dtype="int16"
-    )
-
-    with stream:
-        while True:
-            indata, status = await input_queue.get()
-            yield indata, status
-
-async def write_chunks(stream, handler):
-    async for chunk, status in mic_stream():
-        if handler.stop_transcription:
-            break
-        await stream.input_stream.send_audio_event(audio_chunk=chunk)
-    await stream.input_stream.end_stream()
-
-async def basic_transcribe(transcription_display):
-    client = TranscribeStreamingClient(region="us-east-1")  # Corrected region
-
-    stream = await client.start_stream_transcription(
-        language_code="he-IL",
-        media_sample_rate_hz=16000,
-        media_encoding="pcm",
-        show_speaker_label=True
-    )
-
-    handler = MyEventHandler(stream.output_stream, transcription_display)
-
-    # Create a task for handling events
-    event_task = asyncio.create_task(handler.handle_events())
-
-    # Create a task for writing chunks
-    chunk_task = asyncio.create_task(write_chunks(stream, handler))
-
-    # Wait for both tasks to complete
-    await asyncio.gather(event_task, chunk_task)
+    st.session_state.level_meter = None
 
-    return handler
+    sink = st.session_state.get('recording_sink')
+    st.session_state.recording_sink = None
+    return sink
@@ -0,0 +1,168 @@
+# recording_sink.py
+
+import queue
+import tempfile
+import threading
+import wave
+import numpy as np
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):  # soundfile missing, or libsndfile not available
+    sf = None
+
+from audio_capture import SAMPLE_RATE, CHANNELS
+
+RECORDING_MEMORY_BUDGET = 4 * 1024 * 1024  # Bytes kept in RAM before spilling to a temp file (~2 min at 16 kHz)
+RECORDING_QUEUE_BLOCKS = 512                # Blocks buffered between the audio thread and the writer
+FINISH_POLL_SECONDS = 0.5                   # How often finish() checks that the writer is still alive
+
+# FLAC (lossless, roughly half the size of PCM for speech) when soundfile is available, WAV otherwise
+RECORDING_FORMAT = 'flac' if sf is not None else 'wav'
+
+CONTENT_TYPES = {
+    'flac': 'audio/flac',
+    'wav': 'audio/wav',
+}
+
+
+class WavEncoder:
+    """
+    Writes int16 PCM blocks into a WAV container; the header sizes are filled in on close.
+    """
+
+    def __init__(self, fileobj, samplerate=SAMPLE_RATE, channels=CHANNELS):
+        self._wav = wave.open(fileobj, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(samplerate)
+
+    def write(self, block):
+        # writeframesraw skips re-patching the header on every block
+        self._wav.writeframesraw(block)
+
+    def close(self):
+        self._wav.close()
+
+
+class FlacEncoder:
+    """
+    Encodes int16 PCM blocks to FLAC incrementally with libsndfile.
+    """
+
+    def __init__(self, fileobj, samplerate=SAMPLE_RATE, channels=CHANNELS):
+        self._channels = channels
+        self._flac = sf.SoundFile(
+            fileobj, mode='w', samplerate=samplerate, channels=channels, format='FLAC', subtype='PCM_16'
+        )
+
+    def write(self, block):
+        samples = np.frombuffer(block, dtype=np.int16)
+        if self._channels > 1:
+            samples = samples.reshape(-1, self._channels)
+        self._flac.write(samples)
+
+    def close(self):
+        self._flac.close()
+
+
+ENCODERS = {
+    'flac': FlacEncoder,
+    'wav': WavEncoder,
+}
+
+
+class RecordingSink:
+    """
+    Capture consumer that archives the recording with a fixed memory budget.
+
+    Blocks are handed from the audio thread to a writer thread through a bounded
+    queue, encoded there (FLAC or WAV) and written to a SpooledTemporaryFile, which
+    keeps the first memory_budget bytes in RAM and transparently moves to a temp file
+    on disk after that. Memory per session therefore stays constant regardless of
+    visit length, and the audio thread never does any encoding work.
+    """
+
+    def __init__(self, memory_budget=RECORDING_MEMORY_BUDGET, queue_blocks=RECORDING_QUEUE_BLOCKS,
+                 audio_format=RECORDING_FORMAT):
+        self.file_extension = audio_format
+        self.content_type = CONTENT_TYPES[audio_format]
+        self._file = tempfile.SpooledTemporaryFile(max_size=memory_budget, suffix=f'.{audio_format}')
+        self._encoder = ENCODERS[audio_format](self._file)
+        self._queue = queue.Queue(maxsize=queue_blocks)
+        self._thread = threading.Thread(target=self._run, name='recording-sink', daemon=True)
+        self._finished = False
+        self.bytes_written = 0  # PCM bytes received, before encoding
+        self.dropped_blocks = 0
+        self.error = None       # Why the writer thread stopped early, if it did
+        self._thread.start()
+
+    def __call__(self, block, status):
+        """
+        Called on the audio thread for every captured block; never blocks.
+        """
+        if block is None or self._finished:
+            return
+        try:
+            self._queue.put_nowait(block)
+        except queue.Full:
+            # The disk can't keep up; losing a block beats stalling the audio callback
+            self.dropped_blocks += 1
+
+    @property
+    def spilled(self):
+        """
+        True once the recording outgrew the memory budget and lives on disk.
+        """
+        return bool(getattr(self._file, '_rolled', False))
+
+    def _run(self):
+        try:
+            while True:
+                block = self._queue.get()
+                if block is None:
+                    break
+                self._encoder.write(block)
+                self.bytes_written += len(block)
+            # Finalize the container (header sizes, last FLAC frame)
+            self._encoder.close()
+        except Exception as e:
+            self.error = e
+            print(f"Writing the recording failed: {e}")
+
+    def _stop_writer(self):
+        if self._finished:
+            return
+        self._finished = True
+        # A writer that died leaves the queue full; don't wait for room forever
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=FINISH_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+
+    def finish(self):
+        """
+        Stops accepting audio, waits for pending blocks to be written and returns the
+        recording as a readable file object positioned at its start.
+
+        Returns:
+            file object: The encoded recording (see file_extension and content_type).
+
+        Raises:
+            Exception: The writer thread's error, if it stopped before the end.
+        """
+        self._stop_writer()
+        if self.error is not None:
+            raise self.error
+        self._file.seek(0)
+        return self._file
+
+    def close(self):
+        """
+        Releases the memory or temp file holding the recording.
+        """
+        self._stop_writer()
+        self._file.close()
@@ -0,0 +1,201 @@
+# result_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DISK_SWEEP_SECONDS = 600  # Longest time between two scans of the disk tier for expired entries
+
+
+def make_cache_key(model_id, system_prompt, prompt, **params):
+    """
+    Builds a content-addressed cache key for a model call.
+
+    Parameters:
+        model_id (str): The Bedrock model ID.
+        system_prompt (str): The system prompt.
+        prompt (str): The input text.
+        **params: Any other request parameters that affect the output (max_tokens, temperature...).
+
+    Returns:
+        str: A hex SHA-256 digest.
+    """
+    payload = json.dumps(
+        {"model_id": model_id, "system": system_prompt, "prompt": prompt, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for model results: a bounded in-memory LRU in front of an optional
+    on-disk directory with a TTL and a total size limit. Thread-safe.
+
+    Disk entries expire ttl seconds after they were written (their mtime); when the
+    directory outgrows its limit, the least recently read ones (their atime, set on
+    every hit) go first.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, ttl=None, max_disk_bytes=None):
+        """
+        Parameters:
+            max_entries (int): Maximum number of results kept in memory.
+            disk_dir (str): Directory for the disk tier, or None to keep results in memory only.
+            ttl (float): Seconds a disk entry stays valid, or None for no expiry.
+            max_disk_bytes (int): Size limit of the disk tier, or None for no limit.
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_bytes = None   # Estimated size of the disk tier; None until it is scanned
+        self._last_sweep = 0.0    # time.time() of the last scan
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """
+        Returns the cached result for key, or None on a miss.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Stores a result in both tiers.
+        """
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def stats(self):
+        """
+        Returns the hit/miss counters.
+
+        Returns:
+            dict: memory_hits, disk_hits, misses, hit_rate and the number of entries in memory.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def _memory_put(self, key, value):
+        # Caller holds the lock
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stat = os.stat(path)
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+        except OSError:
+            return None
+        try:
+            # Mark the entry as recently used; the mtime keeps counting towards the TTL
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            pass
+        return value
+
+    def _disk_put(self, key, value):
+        if not self.disk_dir:
+            return
+        try:
+            # Write atomically so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(value)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._disk_path(key))
+            # Scanning the directory is only worth it when the limit may have been passed
+            # or expired entries are due to be swept
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += size
+                due = (
+                    self._disk_bytes is None
+                    or (self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes)
+                    or (self.ttl is not None and time.time() - self._last_sweep > DISK_SWEEP_SECONDS)
+                )
+            if due:
+                self._evict_disk()
+        except OSError as e:
+            print(f"Result cache write failed: {e}")
+
+    def _evict_disk(self):
+        """
+        Removes expired entries, then the least recently used ones until the disk tier
+        fits max_disk_bytes.
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith('.txt'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        if self.max_disk_bytes is not None:
+            for _, size, path in sorted(entries):
+                if total <= self.max_disk_bytes:
+                    break
+                self._remove(path)
+                total -= size
+        with self._lock:
+            self._disk_bytes = total
+            self._last_sweep = now
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
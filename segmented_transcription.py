@@ -0,0 +1,293 @@
+# segmented_transcription.py
+
+import bisect
+import tempfile
+import threading
+import uuid
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from audio_capture import SAMPLE_RATE
+from audio_io import open_audio
+from audio_normalize import normalized_blocks
+from job_tracker import get_job_tracker
+from storage import get_transcribe_client, open_object, upload_audio
+from transcript_parser import TranscriptWord, iter_transcript_words, words_to_turns
+
+# Splitting long uploads for parallel batch transcription
+SEGMENT_MIN_FILE_SECONDS = 600     # Files shorter than this are transcribed as one job
+SEGMENT_TARGET_SECONDS = 300       # Aim for segments of about this length...
+SEGMENT_SEARCH_SECONDS = 30        # ...cut at the quietest point within this distance of the target
+SEGMENT_OVERLAP_SECONDS = 8        # Audio before each cut also sent with the next segment, to match speakers
+SEGMENT_MAX_CONCURRENCY = 4        # Transcription jobs running at once per file
+SEGMENT_MEMORY_BUDGET = 8 * 1024 * 1024  # Segment files spill to disk beyond this
+
+ENERGY_FRAME_SECONDS = 0.1
+ENERGY_SMOOTH_FRAMES = 5           # 0.5 s moving average when looking for silence
+READ_BLOCK_SECONDS = 10
+SPEAKER_MATCH_SECONDS = 0.5        # Words of two segments closer than this are the same word
+
+
+def audio_duration(fileobj):
+    """
+    Returns the duration of an audio file in seconds, or None if it can't be decoded.
+    """
+    try:
+        reader = open_audio(fileobj)
+    except Exception:
+        return None
+    try:
+        return reader.frames / reader.samplerate
+    finally:
+        reader.close()
+        fileobj.seek(0)
+
+
+def _frame_energies(reader):
+    """
+    Computes the energy (dBFS) of every ENERGY_FRAME_SECONDS frame, reading the file
+    block by block so memory stays bounded.
+    """
+    frame_len = int(reader.samplerate * ENERGY_FRAME_SECONDS)
+    block_frames = frame_len * int(READ_BLOCK_SECONDS / ENERGY_FRAME_SECONDS)
+    energies = []
+    reader.seek(0)
+    while True:
+        block = reader.read(block_frames)
+        if len(block) == 0:
+            break
+        mono = block.astype(np.float32).mean(axis=1) / 32768.0
+        n_frames = len(mono) // frame_len
+        if n_frames == 0:
+            break
+        frames = mono[:n_frames * frame_len].reshape(n_frames, frame_len)
+        energies.append(10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10))
+    return np.concatenate(energies) if energies else np.zeros(0)
+
+
+def find_cut_points(energies, duration, target=SEGMENT_TARGET_SECONDS, search=SEGMENT_SEARCH_SECONDS):
+    """
+    Chooses cut times (seconds) about every target seconds, each at the quietest point
+    within search seconds of its target.
+
+    Returns:
+        list[float]: Segment start times, beginning with 0.0.
+    """
+    smoothed = np.convolve(energies, np.ones(ENERGY_SMOOTH_FRAMES) / ENERGY_SMOOTH_FRAMES, mode='same')
+    cuts = [0.0]
+    while cuts[-1] + target + search < duration:
+        low = int((cuts[-1] + target - search) / ENERGY_FRAME_SECONDS)
+        high = int((cuts[-1] + target + search) / ENERGY_FRAME_SECONDS)
+        window = smoothed[low:high]
+        if window.size == 0:
+            break
+        cuts.append(round((low + int(np.argmin(window))) * ENERGY_FRAME_SECONDS, 3))
+    return cuts
+
+
+def _write_segment(reader, start, end):
+    """
+    Copies [start, end) seconds of the file into a 16 kHz mono WAV temp file.
+    """
+    segment_file = tempfile.SpooledTemporaryFile(max_size=SEGMENT_MEMORY_BUDGET, suffix='.wav')
+    first = int(start * reader.samplerate)
+    with wave.open(segment_file, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for block in normalized_blocks(reader, first, int(end * reader.samplerate) - first):
+            wav.writeframesraw(block.tobytes())
+    segment_file.seek(0)
+    return segment_file
+
+
+def _reconcile_speakers(previous_words, words):
+    """
+    Maps the speaker labels of a segment onto the labels used so far, by matching the
+    words both segments transcribed in their overlap.
+
+    Parameters:
+        previous_words (list[TranscriptWord]): Overlap words of the previous segment, already mapped.
+        words (list[TranscriptWord]): Overlap words of this segment, with its own labels.
+
+    Returns:
+        dict: This segment's label -> global label, for the labels seen in the overlap.
+    """
+    starts = [word.start_time for word in previous_words]
+    votes = Counter()
+    for word in words:
+        index = bisect.bisect_left(starts, word.start_time)
+        candidates = [i for i in (index - 1, index) if 0 <= i < len(previous_words)]
+        if not candidates:
+            continue
+        nearest = min(candidates, key=lambda i: abs(starts[i] - word.start_time))
+        if abs(starts[nearest] - word.start_time) <= SPEAKER_MATCH_SECONDS:
+            votes[(word.speaker, previous_words[nearest].speaker)] += 1
+
+    # One-to-one, strongest agreement first
+    mapping = {}
+    used = set()
+    for (local, global_label), _ in votes.most_common():
+        if local not in mapping and global_label not in used:
+            mapping[local] = global_label
+            used.add(global_label)
+    return mapping
+
+
+def _unmapped_label(label, index, mapping, known_labels):
+    """
+    Picks a global label for a speaker the overlap didn't identify: the first segment
+    keeps its own labels, later ones take the first known label not mapped yet, or a
+    new one.
+    """
+    if index == 0:
+        return label
+    taken = set(mapping.values())
+    for known in known_labels:
+        if known not in taken:
+            return known
+    number = len(known_labels)
+    while f"spk_{number}" in taken:
+        number += 1
+    return f"spk_{number}"
+
+
+def stitch_segments(segment_words, cuts, overlap=SEGMENT_OVERLAP_SECONDS):
+    """
+    Merges the words of consecutive segments into one transcript.
+
+    Times must already be in file time. Each segment owns the words from its cut
+    onwards; the words before the cut (the overlap) are only used to map its speaker
+    labels onto those of the previous segments.
+
+    Returns:
+        list[TranscriptWord]: The merged words, with consistent speaker labels.
+    """
+    merged = []
+    known_labels = []
+    for index, words in enumerate(segment_words):
+        cut = cuts[index]
+        if index == 0:
+            mapping = {}
+        else:
+            previous_overlap = [w for w in merged if not w.is_punctuation and w.start_time >= cut - overlap]
+            own_overlap = [w for w in words if not w.is_punctuation and w.start_time < cut]
+            mapping = _reconcile_speakers(previous_overlap, own_overlap)
+
+        for word in words:
+            if word.speaker is not None and word.speaker not in mapping:
+                mapping[word.speaker] = _unmapped_label(word.speaker, index, mapping, known_labels)
+            if word.start_time < cut:
+                continue
+            speaker = mapping.get(word.speaker) if word.speaker is not None else None
+            if speaker is not None and speaker not in known_labels:
+                known_labels.append(speaker)
+            merged.append(TranscriptWord(word.start_time, word.end_time, word.content, word.is_punctuation, speaker))
+    return merged
+
+
+class SegmentedTranscription:
+    """
+    Transcribes a long audio file as several batch jobs running in parallel.
+
+    The file is cut at silences, each segment (plus a short overlap) is uploaded and
+    transcribed under a concurrency cap, and the results are stitched back with time
+    offsets and reconciled speaker labels. Runs on a background thread; the file object
+    must not be used by anyone else until it finishes.
+    """
+
+    def __init__(self, fileobj, bucket_name, folder_name, language_code, max_speaker_labels,
+                 max_concurrency=SEGMENT_MAX_CONCURRENCY):
+        self.fileobj = fileobj
+        self.bucket_name = bucket_name
+        self.folder_name = folder_name
+        self.language_code = language_code
+        self.max_speaker_labels = max_speaker_labels
+        self.max_concurrency = max_concurrency
+        self.segment_count = 0
+        self.segments_done = 0
+        self.words = None
+        self.text = None
+        self.error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='segmented-transcription', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the transcription finishes or timeout seconds pass.
+
+        Returns:
+            bool: True if it has finished (successfully or not).
+        """
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            reader = open_audio(self.fileobj)
+            try:
+                duration = reader.frames / reader.samplerate
+                cuts = find_cut_points(_frame_energies(reader), duration)
+                self.segment_count = len(cuts)
+                ends = cuts[1:] + [duration]
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                    futures = []
+                    for index, (cut, end) in enumerate(zip(cuts, ends)):
+                        start = max(0.0, cut - SEGMENT_OVERLAP_SECONDS) if index else 0.0
+                        segment_file = _write_segment(reader, start, end)
+                        futures.append(executor.submit(self._transcribe_segment, index, segment_file, start))
+                    segment_words = [future.result() for future in futures]
+            finally:
+                reader.close()
+            self.words = stitch_segments(segment_words, cuts)
+            self.text = words_to_turns(self.words)
+        except Exception as e:
+            self.error = e
+            print(f"Segmented transcription of {self.folder_name} failed: {e}")
+        finally:
+            self._done.set()
+
+    def _transcribe_segment(self, index, segment_file, offset):
+        """
+        Uploads one segment, transcribes it and returns its words in file time.
+        """
+        s3_key = f"{self.folder_name}/segments/{index:03d}.wav"
+        try:
+            upload_audio(segment_file, self.bucket_name, s3_key, 'audio/wav')
+        finally:
+            segment_file.close()
+
+        job_name = f"transcription_{uuid.uuid4()}"
+        transcript_key = f"{self.folder_name}/segments/{index:03d}.json"
+        get_transcribe_client().start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={'MediaFileUri': f"s3://{self.bucket_name}/{s3_key}"},
+            MediaFormat='wav',
+            OutputBucketName=self.bucket_name,
+            OutputKey=transcript_key,
+            LanguageCode=self.language_code,
+            Settings={
+                'ShowSpeakerLabels': True,  # Enable speaker identification
+                'MaxSpeakerLabels': self.max_speaker_labels
+            }
+        )
+        tracked_job = get_job_tracker().track(job_name)
+        tracked_job.wait()
+        if tracked_job.status != 'COMPLETED':
+            raise RuntimeError(f"Transcription of segment {index} ended with status {tracked_job.status}")
+
+        transcript_body = open_object(self.bucket_name, transcript_key)
+        try:
+            words = []
+            for word in iter_transcript_words(transcript_body):
+                word.start_time += offset
+                word.end_time += offset
+                words.append(word)
+        finally:
+            transcript_body.close()
+        self.segments_done += 1
+        return words
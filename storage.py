@@ -0,0 +1,276 @@
+# storage.py
+
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+S3_REGION = 'us-east-1'
+TRANSCRIBE_REGION = 'us-east-1'
+
+# Multipart settings for audio uploads
+AUDIO_PART_SIZE = 8 * 1024 * 1024  # Bytes per part (S3 minimum is 5 MiB)
+AUDIO_MAX_CONCURRENCY = 8          # Parts uploaded in parallel
+PROGRESS_INTERVAL = 0.25           # Seconds between progress callbacks
+
+# Write-behind uploads of text artifacts
+WRITE_BEHIND_WORKERS = 4           # Concurrent put_object calls, shared by all sessions
+WRITE_BEHIND_MAX_PENDING = 64      # Callers block beyond this many queued writes
+WRITE_RETRIES = 3                  # Attempts per write
+WRITE_RETRY_DELAY = 0.5            # Seconds before the first retry, doubled after each
+WRITE_FLUSH_TIMEOUT = 30           # Seconds the process waits for queued writes on exit
+
+# Process-wide S3 client, shared by all Streamlit sessions
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Returns the process-wide S3 client, creating it on first use.
+
+    Returns:
+        botocore.client.BaseClient: The shared S3 client.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.session.Session().client(
+                    's3',
+                    region_name=S3_REGION,
+                    # Room for the parallel part uploads of several sessions
+                    config=Config(max_pool_connections=4 * AUDIO_MAX_CONCURRENCY)
+                )
+    return _s3_client
+
+
+# Process-wide Transcribe client, shared by the pipeline, segment threads and the job tracker
+_transcribe_client = None
+_transcribe_client_lock = threading.Lock()
+
+
+def get_transcribe_client():
+    """
+    Returns the process-wide Transcribe (batch) client, creating it on first use.
+
+    Returns:
+        botocore.client.BaseClient: The shared Transcribe client.
+    """
+    global _transcribe_client
+    if _transcribe_client is None:
+        with _transcribe_client_lock:
+            if _transcribe_client is None:
+                # A dedicated session, so creating it doesn't race with the default one
+                _transcribe_client = boto3.session.Session().client('transcribe', region_name=TRANSCRIBE_REGION)
+    return _transcribe_client
+
+
+def _stream_size(fileobj):
+    """
+    Returns the number of bytes left in a seekable file object, without reading it.
+    """
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size - position
+
+
+def upload_audio(fileobj, bucket_name, key, content_type, on_progress=None,
+                 part_size=AUDIO_PART_SIZE, max_concurrency=AUDIO_MAX_CONCURRENCY):
+    """
+    Uploads audio to S3 with a managed multipart transfer, streaming straight from the
+    file object (no intermediate copy of the whole file).
+
+    The transfer runs on worker threads; on_progress is called from the calling thread,
+    so it may safely update Streamlit elements.
+
+    Parameters:
+        fileobj: A readable binary file object, positioned at the start of the audio.
+        bucket_name (str): The S3 bucket.
+        key (str): The S3 key.
+        content_type (str): The audio MIME type.
+        on_progress (callable): Called as on_progress(bytes_sent, total_bytes).
+        part_size (int): Multipart part size in bytes.
+        max_concurrency (int): Number of parts uploaded in parallel.
+    """
+    transfer_config = TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=max_concurrency
+    )
+    total = _stream_size(fileobj)
+    sent = [0]
+    sent_lock = threading.Lock()
+    done = threading.Event()
+    errors = []
+
+    def count_bytes(amount):
+        with sent_lock:
+            sent[0] += amount
+
+    def transfer():
+        try:
+            get_s3_client().upload_fileobj(
+                fileobj,
+                bucket_name,
+                key,
+                ExtraArgs={'ContentType': content_type},
+                Config=transfer_config,
+                Callback=count_bytes
+            )
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    threading.Thread(target=transfer, daemon=True).start()
+    while not done.wait(PROGRESS_INTERVAL):
+        if on_progress:
+            with sent_lock:
+                bytes_sent = sent[0]
+            on_progress(bytes_sent, total)
+
+    if errors:
+        raise errors[0]
+    if on_progress:
+        on_progress(total, total)
+
+
+def open_object(bucket_name, key):
+    """
+    Opens an S3 object for streaming reads, without downloading it first.
+
+    Returns:
+        botocore.response.StreamingBody: The object's body; read it in pieces and close it.
+    """
+    return get_s3_client().get_object(Bucket=bucket_name, Key=key)['Body']
+
+
+class WriteBehindUploader:
+    """
+    Writes small objects to S3 in the background so pipeline stages don't wait on storage.
+
+    Writes run on a bounded thread pool and are retried with exponential backoff; when
+    too many are queued, put_text blocks until one finishes. Every write returns a
+    Future, and flush() waits for all of them (it also runs at interpreter exit).
+    """
+
+    def __init__(self, max_workers=WRITE_BEHIND_WORKERS, max_pending=WRITE_BEHIND_MAX_PENDING,
+                 retries=WRITE_RETRIES, retry_delay=WRITE_RETRY_DELAY):
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.written = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-write-behind')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def put_text(self, bucket_name, key, text, content_type='text/plain'):
+        """
+        Queues a text object for upload.
+
+        Parameters:
+            bucket_name (str): The S3 bucket.
+            key (str): The S3 key.
+            text (str): The object's content.
+            content_type (str): The MIME type.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the put_object response, or raises the
+            last error once the retries are exhausted.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, bucket_name, key, text, content_type)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _write(self, bucket_name, key, text, content_type):
+        delay = self.retry_delay
+        for attempt in range(self.retries):
+            try:
+                response = get_s3_client().put_object(
+                    Bucket=bucket_name,
+                    Key=key,
+                    Body=text,
+                    ContentType=content_type
+                )
+                break
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    print(f"Writing s3://{bucket_name}/{key} failed: {e}")
+                    raise
+                time.sleep(delay)
+                delay *= 2
+        return response
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending.discard(future)
+            if future.exception() is None:
+                self.written += 1
+            else:
+                self.failed += 1
+        self._slots.release()
+
+    def flush(self, timeout=None):
+        """
+        Waits for every queued write to finish.
+
+        Returns:
+            bool: True if nothing is left pending.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        _, not_done = wait(pending, timeout)
+        return not not_done
+
+    def stats(self):
+        """
+        Returns the number of pending, written and failed writes.
+        """
+        with self._lock:
+            return {"pending": len(self._pending), "written": self.written, "failed": self.failed}
+
+
+class BucketWriter:
+    """
+    Saves pipeline artifacts straight to S3 through the write-behind uploader, with no
+    cache; for callers that never read the artifacts back (batch runs, queue workers).
+    """
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+
+    def save(self, key, text, content_type='text/plain'):
+        return get_write_behind().put_text(self.bucket_name, key, text, content_type)
+
+
+_write_behind = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind():
+    """
+    Returns the process-wide write-behind uploader, creating it on first use.
+    """
+    global _write_behind
+    if _write_behind is None:
+        with _write_behind_lock:
+            if _write_behind is None:
+                _write_behind = WriteBehindUploader()
+                # Don't lose artifacts that are still queued when the server stops
+                atexit.register(_write_behind.flush, WRITE_FLUSH_TIMEOUT)
+    return _write_behind
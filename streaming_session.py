@@ -0,0 +1,390 @@
+# streaming_session.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from amazon_transcribe.client import TranscribeStreamingClient
+from handlers import TranscriptResultStreamHandler  # Ensure absolute import
+from audio_capture import SAMPLE_RATE
+from transcript_store import TranscriptStore
+from audio_queue import AudioQueue
+from vad import VoiceActivityGate
+
+STOP_TIMEOUT = 15  # Seconds to wait for the last results after stopping a stream
+
+# Sessions whose browser tab is gone are stopped by a background reaper. A tab counts
+# as alive while it is connected to the server, even when the browser throttles its
+# timers (hidden tabs poll as rarely as once a minute)
+SESSION_IDLE_TIMEOUT = 120        # Seconds since the page was last connected or polled
+SESSION_MAX_SECONDS = 8 * 3600    # Longest a single recording may run
+REAPER_INTERVAL = 10              # Seconds between reaper checks
+
+# Streams are replaced before the service's 4-hour session limit
+STREAM_ROLLOVER_SECONDS = 3.75 * 3600
+REPLAY_SECONDS = 5.0          # Recently sent audio replayed into a replacement stream
+MAX_RECONNECT_ATTEMPTS = 5    # Consecutive failures before the session gives up
+RECONNECT_BACKOFF = 0.5       # Seconds before the first reconnect, doubled on each failure
+
+BYTES_PER_SECOND = SAMPLE_RATE * 2  # Mono int16 PCM
+
+# write_chunks outcomes
+STREAM_DONE = 'done'
+STREAM_ROLLOVER = 'rollover'
+
+
+# Event handler class
+class MyEventHandler(TranscriptResultStreamHandler):
+    def __init__(self, stream, store, time_offset=0.0):
+        super().__init__(stream)
+        self.store = store
+        # Result times are relative to this stream; the offset maps them to session time
+        self.time_offset = time_offset
+        self.event_count = 0
+        self.stop_transcription = False
+        self._last_partial = None  # (result_id, stable item count) of the last partial stored
+
+    async def handle_transcript_event(self, transcript_event):
+        # Results keep arriving after stop_transcription until the service closes the
+        # stream, so the last words spoken before stopping are not lost
+        results = transcript_event.transcript.results
+        self.event_count += 1
+        for result in results:
+            if len(result.alternatives) == 0:
+                continue
+            alternative = result.alternatives[0]
+            speaker = alternative.items[0].speaker if alternative.items else None
+            start_time = result.start_time + self.time_offset
+            end_time = result.end_time + self.time_offset
+
+            # Audio replayed into a replacement stream is transcribed twice; skip results
+            # that the previous stream already delivered
+            if (start_time + end_time) / 2 <= self.store.last_end_time:
+                continue
+
+            # Final results are appended; a partial result only replaces the current partial segment
+            if not result.is_partial:
+                self.store.add_final(speaker, start_time, end_time, alternative.transcript)
+                self._last_partial = None
+            else:
+                # With stabilization on, skip partials whose stable part didn't grow
+                stable_items = sum(1 for item in alternative.items if getattr(item, 'stable', None) is not False)
+                partial_key = (result.result_id, stable_items)
+                if partial_key == self._last_partial:
+                    continue
+                self._last_partial = partial_key
+                self.store.set_partial(speaker, start_time, end_time, alternative.transcript)
+
+class ReplayBuffer:
+    """
+    Ring buffer of the most recently sent audio, replayed into a replacement stream
+    after a failure.
+    """
+
+    def __init__(self, seconds=REPLAY_SECONDS):
+        self.max_bytes = int(seconds * BYTES_PER_SECOND)
+        self._chunks = deque()
+        self._bytes = 0
+        self.sent_bytes = 0  # All audio sent in this session, replays excluded
+
+    def add(self, chunk):
+        self._chunks.append(chunk)
+        self._bytes += len(chunk)
+        self.sent_bytes += len(chunk)
+        while self._bytes - len(self._chunks[0]) >= self.max_bytes:
+            self._bytes -= len(self._chunks.popleft())
+
+    def snapshot(self):
+        """
+        Returns the buffered chunks and the session time (seconds) at which they start.
+        """
+        return list(self._chunks), (self.sent_bytes - self._bytes) / BYTES_PER_SECOND
+
+    @property
+    def end_time(self):
+        """
+        Session time (seconds) at the end of the audio sent so far.
+        """
+        return self.sent_bytes / BYTES_PER_SECOND
+
+async def write_chunks(stream, handler, audio_queue, gate, replay, replay_chunks):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    # Replay the tail of the previous stream first
+    for chunk in replay_chunks:
+        await stream.input_stream.send_audio_event(audio_chunk=chunk)
+
+    outcome = STREAM_DONE
+    while not handler.stop_transcription:
+        chunk = await audio_queue.get()
+        if chunk is None:  # Capture stopped
+            break
+        # Silent stretches are thinned out before they reach the service
+        if gate is not None:
+            chunk = gate.process(chunk)
+            if not chunk:
+                continue
+        replay.add(chunk)
+        await stream.input_stream.send_audio_event(audio_chunk=chunk)
+        if loop.time() - started > STREAM_ROLLOVER_SECONDS:
+            outcome = STREAM_ROLLOVER
+            break
+    await stream.input_stream.end_stream()
+    return outcome
+
+async def basic_transcribe(store, capture, on_handler=None, on_queue=None, gate=None):
+    """
+    Streams the capture to Amazon Transcribe until the capture stops or
+    stop_transcription is set, filling the store.
+
+    A stream that fails, or gets close to the service's session limit, is replaced by
+    a new one. After a failure the last REPLAY_SECONDS of audio are replayed into it and
+    overlapping results are deduplicated, so the transcript continues without a gap. A
+    rollover closes the old stream cleanly, so all of its audio is already final and
+    the new stream simply continues from there.
+    """
+    client = TranscribeStreamingClient(region="us-east-1")  # Corrected region
+
+    # The bounded queue coalesces blocks when sending falls behind and drops the
+    # oldest audio beyond its latency budget. It outlives individual streams, so no
+    # audio is lost while a replacement stream connects.
+    audio_queue = AudioQueue(asyncio.get_running_loop())
+    if on_queue:
+        on_queue(audio_queue)
+    capture.subscribe(audio_queue.put)
+    if not capture.active:  # Stopped before the stream was open
+        audio_queue.put(None, None)
+
+    replay = ReplayBuffer()
+    handler = None
+    failures = 0
+    failed = False  # The previous stream broke off, so its last results may be missing
+    try:
+        while True:
+            if failed:
+                replay_chunks, time_offset = replay.snapshot()
+            else:
+                replay_chunks, time_offset = [], replay.end_time
+            try:
+                stream = await client.start_stream_transcription(
+                    language_code="he-IL",
+                    media_sample_rate_hz=SAMPLE_RATE,
+                    media_encoding="pcm",
+                    show_speaker_label=True,
+                    # Only stabilized words change between partial results
+                    enable_partial_results_stabilization=True,
+                    partial_results_stability="high"
+                )
+            except Exception as e:
+                failures += 1
+                if failures > MAX_RECONNECT_ATTEMPTS:
+                    raise
+                print(f"Opening transcription stream failed: {e}. Retrying...")
+                await asyncio.sleep(RECONNECT_BACKOFF * 2 ** (failures - 1))
+                continue
+
+            previous, handler = handler, MyEventHandler(stream.output_stream, store, time_offset)
+            if previous is not None:
+                handler.stop_transcription = previous.stop_transcription
+            if on_handler:
+                on_handler(handler)
+
+            # Create a task for handling events
+            event_task = asyncio.create_task(handler.handle_events())
+
+            # Create a task for writing chunks
+            chunk_task = asyncio.create_task(write_chunks(stream, handler, audio_queue, gate, replay, replay_chunks))
+
+            # Wait for both tasks to complete
+            try:
+                await asyncio.gather(event_task, chunk_task)
+            except Exception as e:
+                event_task.cancel()
+                chunk_task.cancel()
+                await asyncio.gather(event_task, chunk_task, return_exceptions=True)
+                failures += 1
+                if failures > MAX_RECONNECT_ATTEMPTS:
+                    raise
+                failed = True
+                print(f"Transcription stream failed: {e}. Reconnecting...")
+                await asyncio.sleep(RECONNECT_BACKOFF * 2 ** (failures - 1))
+                continue
+
+            failures = 0
+            failed = False
+            if chunk_task.result() == STREAM_ROLLOVER:
+                continue
+            return handler
+    finally:
+        capture.unsubscribe(audio_queue.put)
+
+
+class StreamingSession:
+    """
+    One live transcription running in the background: its own thread and event loop,
+    reading from an AudioCapture and filling a TranscriptStore.
+
+    The Streamlit script only starts, polls (store, error, active) and stops it, so
+    reruns are never blocked while the stream is open.
+    """
+
+    def __init__(self, session_key, capture, use_vad=True):
+        self.session_key = session_key
+        self.capture = capture
+        self.store = TranscriptStore()
+        self.gate = VoiceActivityGate() if use_vad else None
+        self.handler = None
+        self.audio_queue = None
+        self.error = None
+        self.started_at = time.monotonic()
+        self.last_seen = self.started_at  # Last time the page was connected or polled this session
+        self._thread = threading.Thread(target=self._run, name=f'transcribe-{session_key}', daemon=True)
+
+    @property
+    def active(self):
+        return self._thread.is_alive()
+
+    def start(self):
+        """
+        Starts the microphone capture and the streaming transcription thread.
+        """
+        self.capture.start()
+        self._thread.start()
+
+    def _set_handler(self, handler):
+        self.handler = handler
+
+    def _set_queue(self, audio_queue):
+        self.audio_queue = audio_queue
+
+    def stats(self):
+        """
+        Returns the audio queue counters (backlog, overruns, status flags) and the share of
+        audio suppressed as silence, or None before streaming starts.
+        """
+        if self.audio_queue is None:
+            return None
+        stats = self.audio_queue.stats()
+        if self.gate is not None:
+            stats["suppressed_ratio"] = self.gate.stats()["suppressed_ratio"]
+        return stats
+
+    def _run(self):
+        try:
+            asyncio.run(basic_transcribe(
+                self.store, self.capture, on_handler=self._set_handler, on_queue=self._set_queue, gate=self.gate
+            ))
+        except Exception as e:
+            # basic_transcribe has unsubscribed from the capture; it keeps running, so
+            # the archived recording goes on until the user stops it
+            self.error = e
+            print(f"Streaming transcription {self.session_key} failed: {e}")
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stops sending audio and waits for the stream to deliver its last results.
+
+        Returns:
+            TranscriptStore: The transcript of the session.
+        """
+        if self.handler is not None:
+            self.handler.stop_transcription = True
+        # Stopping the capture ends the audio queue, which ends the stream
+        self.capture.stop()
+        self._thread.join(timeout)
+        return self.store
+
+
+# Live sessions by Streamlit session key
+_sessions = {}
+_sessions_lock = threading.Lock()
+_reaper = None
+
+
+def start_streaming_session(session_key, capture):
+    """
+    Starts a background streaming session for a Streamlit session, stopping any
+    previous one it still has.
+
+    Returns:
+        StreamingSession: The started session.
+    """
+    global _reaper
+    stop_streaming_session(session_key)
+    session = StreamingSession(session_key, capture)
+    with _sessions_lock:
+        _sessions[session_key] = session
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap_sessions, name='streaming-session-reaper', daemon=True)
+            _reaper.start()
+    session.start()
+    return session
+
+
+def get_streaming_session(session_key):
+    """
+    Returns the streaming session of a Streamlit session, or None. Polling it, like
+    staying connected, keeps the session from being reaped as abandoned.
+    """
+    with _sessions_lock:
+        session = _sessions.get(session_key)
+        if session is not None:
+            session.last_seen = time.monotonic()
+        return session
+
+
+def stop_streaming_session(session_key):
+    """
+    Stops and unregisters the streaming session of a Streamlit session.
+
+    Returns:
+        TranscriptStore: Its transcript, or None if it had no session.
+    """
+    with _sessions_lock:
+        session = _sessions.pop(session_key, None)
+    if session is None:
+        return None
+    return session.stop()
+
+
+def _page_connected(session_key):
+    """
+    Returns whether the browser session is still connected to the Streamlit server, or
+    False when there is no Streamlit runtime to ask.
+    """
+    # Imported here so the module stays usable without a running Streamlit server
+    from streamlit import runtime
+    if not runtime.exists():
+        return False
+    return runtime.get_instance().is_active_session(session_key)
+
+
+def _reap_sessions():
+    """
+    Stops sessions whose page has been gone for SESSION_IDLE_TIMEOUT (the tab was closed
+    or the Streamlit session expired) or that ran past SESSION_MAX_SECONDS, releasing
+    the microphone and the registry entry.
+    """
+    while True:
+        time.sleep(REAPER_INTERVAL)
+        now = time.monotonic()
+        with _sessions_lock:
+            for session_key, session in _sessions.items():
+                if _page_connected(session_key):
+                    session.last_seen = now
+            abandoned = [
+                key for key, session in _sessions.items()
+                if now - session.last_seen > SESSION_IDLE_TIMEOUT or now - session.started_at > SESSION_MAX_SECONDS
+            ]
+        for session_key in abandoned:
+            print(f"Stopping abandoned streaming session {session_key}")
+            stop_streaming_session(session_key)
+
+
+def active_session_count():
+    """
+    Returns the number of streaming sessions currently running in this process.
+    """
+    with _sessions_lock:
+        return sum(1 for session in _sessions.values() if session.active)
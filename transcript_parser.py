@@ -0,0 +1,144 @@
+# transcript_parser.py
+
+import json
+
+try:
+    import ijson
+except ImportError:  # Optional: without it the document is parsed in one piece
+    ijson = None
+
+# ijson prefixes of the objects the streaming parser builds
+ITEM_PREFIX = 'results.items.item'
+SPEAKER_ITEM_PREFIX = 'results.speaker_labels.segments.item.items.item'
+
+
+class TranscriptWord:
+    """
+    One word (or punctuation mark) of a batch transcript.
+    """
+    __slots__ = ('start_time', 'end_time', 'content', 'is_punctuation', 'speaker')
+
+    def __init__(self, start_time, end_time, content, is_punctuation, speaker):
+        self.start_time = start_time  # Seconds; punctuation inherits the previous word's times
+        self.end_time = end_time
+        self.content = content
+        self.is_punctuation = is_punctuation
+        self.speaker = speaker        # Transcribe label ("spk_0"...) or None
+
+
+def parse_transcript_words(transcript_json):
+    """
+    Extracts the words of a Transcribe batch result with their times and speakers.
+
+    Speakers come from the item's own speaker_label when present, otherwise from the
+    results.speaker_labels segments.
+
+    Parameters:
+        transcript_json (dict): The job's transcript document.
+
+    Returns:
+        list[TranscriptWord]: The words in order.
+    """
+    results = transcript_json['results']
+
+    # Older documents only carry speakers in speaker_labels, keyed by start time
+    speaker_by_start = {}
+    for segment in results.get('speaker_labels', {}).get('segments', []):
+        for item in segment.get('items', []):
+            speaker_by_start[item['start_time']] = item['speaker_label']
+
+    words = []
+    for item in results.get('items', []):
+        words.append(_item_to_word(item, words[-1] if words else None, speaker_by_start))
+    return words
+
+
+def iter_transcript_words(stream):
+    """
+    Yields the words of a Transcribe batch result read from a byte stream.
+
+    With ijson the document is parsed incrementally: only one item is materialized at a
+    time (plus a start time -> speaker map when speakers are given in speaker_labels,
+    which Transcribe writes before items). Without ijson the whole document is loaded.
+
+    Parameters:
+        stream: A readable binary stream of the transcript JSON (e.g. an S3 body).
+
+    Returns:
+        Iterator[TranscriptWord]: The words in order.
+    """
+    if ijson is None:
+        yield from parse_transcript_words(json.load(stream))
+        return
+
+    speaker_by_start = {}
+    previous = None
+    builder = None
+    builder_prefix = None
+    for prefix, event, value in ijson.parse(stream):
+        if builder is None:
+            if event == 'start_map' and prefix in (ITEM_PREFIX, SPEAKER_ITEM_PREFIX):
+                builder = ijson.ObjectBuilder()
+                builder_prefix = prefix
+                builder.event(event, value)
+            continue
+
+        builder.event(event, value)
+        if event == 'end_map' and prefix == builder_prefix:
+            item = builder.value
+            builder = None
+            if builder_prefix == SPEAKER_ITEM_PREFIX:
+                speaker_by_start[item['start_time']] = item['speaker_label']
+            else:
+                previous = _item_to_word(item, previous, speaker_by_start)
+                yield previous
+
+
+def _item_to_word(item, previous, speaker_by_start):
+    """
+    Builds a TranscriptWord from one entry of results.items.
+    """
+    content = item['alternatives'][0]['content']
+    if item.get('type') == 'punctuation' or 'start_time' not in item:
+        start = end = previous.end_time if previous else 0.0
+        speaker = previous.speaker if previous else None
+        return TranscriptWord(start, end, content, True, speaker)
+    speaker = item.get('speaker_label') or speaker_by_start.get(item['start_time'])
+    return TranscriptWord(float(item['start_time']), float(item['end_time']), content, False, speaker)
+
+
+def speaker_name(label):
+    """
+    Turns a Transcribe speaker label ("spk_0") into the displayed form ("דובר 0").
+    """
+    return f"דובר {label.split('_')[-1]}"  # Hebrew "Speaker"
+
+
+def words_to_turns(words):
+    """
+    Joins words into speaker turns, one line per turn, prefixed with the speaker.
+
+    Returns:
+        str: The transcript text.
+    """
+    lines = []
+    current_speaker = None
+    current = []
+    for word in words:
+        if not word.is_punctuation and word.speaker != current_speaker and current:
+            lines.append(_turn_line(current_speaker, current))
+            current = []
+        if not word.is_punctuation or current:
+            if not word.is_punctuation:
+                current_speaker = word.speaker
+            current.append(word)
+    if current:
+        lines.append(_turn_line(current_speaker, current))
+    return '\n'.join(lines)
+
+
+def _turn_line(speaker, words):
+    text = ''
+    for word in words:
+        text += word.content if word.is_punctuation or not text else ' ' + word.content
+    return f"{speaker_name(speaker)}: {text}" if speaker else text
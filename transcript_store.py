@@ -0,0 +1,80 @@
+# transcript_store.py
+
+
+class TranscriptSegment:
+    """
+    One final transcript result.
+    """
+    __slots__ = ('speaker', 'start_time', 'end_time', 'text')
+
+    def __init__(self, speaker, start_time, end_time, text):
+        self.speaker = speaker        # Speaker label from Transcribe ("0", "1"...), or None
+        self.start_time = start_time  # Seconds from the start of the stream
+        self.end_time = end_time
+        self.text = text
+
+    def line(self):
+        """
+        Renders the segment as a transcript line, prefixed with the speaker if known.
+        """
+        if self.speaker is not None:
+            return f"דובר {self.speaker}: {self.text}"  # Hebrew "Speaker"
+        return self.text
+
+
+class TranscriptStore:
+    """
+    Live transcript as an append-only list of final segments plus a single mutable
+    partial segment.
+
+    Adding a final result or replacing the partial one is O(1); the text is only built
+    when render is called, and the final part is cached until the next final arrives.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.partial = None
+        self._finals_text = ""
+        self._finals_rendered = 0  # Number of segments included in _finals_text
+
+    def add_final(self, speaker, start_time, end_time, text):
+        """
+        Appends a final segment; it replaces the current partial one.
+        """
+        self.segments.append(TranscriptSegment(speaker, start_time, end_time, text))
+        self.partial = None
+
+    def set_partial(self, speaker, start_time, end_time, text):
+        """
+        Replaces the current partial segment.
+        """
+        self.partial = TranscriptSegment(speaker, start_time, end_time, text)
+
+    @property
+    def last_end_time(self):
+        """
+        End time of the last final segment, or 0.0 if there is none.
+        """
+        return self.segments[-1].end_time if self.segments else 0.0
+
+    def finals_text(self):
+        """
+        Returns the text of all final segments, one line each.
+        """
+        if self._finals_rendered != len(self.segments):
+            new_lines = ''.join(segment.line() + "\n" for segment in self.segments[self._finals_rendered:])
+            self._finals_text += new_lines
+            self._finals_rendered = len(self.segments)
+        return self._finals_text
+
+    def render(self, include_partial=True):
+        """
+        Returns the transcript text, optionally followed by the current partial line.
+        """
+        text = self.finals_text()
+        if include_partial and self.partial is not None:
+            text += self.partial.line()
+        return text
+
+    def __len__(self):
+        return len(self.segments)
@@ -0,0 +1,113 @@
+# vad.py
+
+from collections import deque
+import numpy as np
+from audio_capture import SAMPLE_RATE
+
+VAD_FRAME_MS = 20             # Analysis frame length
+VAD_MIN_ENERGY_DB = -50.0     # Frames quieter than this (dBFS) are never speech
+VAD_SNR_DB = 10.0             # Speech must be this much louder than the noise floor
+VAD_FRICATIVE_ZCR = 0.25      # Quieter frames with this zero-crossing rate still count (s, sh, f...)
+VAD_FRICATIVE_SNR_DB = 4.0
+VAD_HANGOVER_MS = 500         # Keep sending this long after the last speech frame
+VAD_PREROLL_MS = 300          # Audio sent ahead of a speech onset, so word starts aren't clipped
+VAD_KEEPALIVE_SECONDS = 5.0   # During silence send one frame this often; the stream times out after 15 s without audio
+NOISE_FLOOR_FALL = 0.5        # Noise floor follows quieter frames quickly...
+NOISE_FLOOR_RISE = 0.01       # ...and louder ones slowly, so speech doesn't raise it
+
+
+class VoiceActivityGate:
+    """
+    Energy / zero-crossing voice activity gate over int16 PCM chunks.
+
+    Chunks are cut into fixed frames and classified in one vectorized pass. Speech
+    frames, the hangover after them and a short pre-roll before them are passed
+    through; silent stretches are reduced to a single keep-alive frame every few
+    seconds.
+    """
+
+    def __init__(self, samplerate=SAMPLE_RATE, frame_ms=VAD_FRAME_MS, hangover_ms=VAD_HANGOVER_MS,
+                 preroll_ms=VAD_PREROLL_MS, keepalive_seconds=VAD_KEEPALIVE_SECONDS):
+        self.frame_len = samplerate * frame_ms // 1000
+        self.hangover_frames = hangover_ms // frame_ms
+        self.keepalive_frames = int(keepalive_seconds * 1000 / frame_ms)
+        self._preroll = deque(maxlen=preroll_ms // frame_ms)
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._noise_floor_db = VAD_MIN_ENERGY_DB
+        self._hangover = 0
+        self._silent_frames = 0
+        self.frames_in = 0
+        self.frames_sent = 0
+
+    def _classify(self, frames):
+        """
+        Returns a boolean speech mask for a (n_frames, frame_len) int16 array.
+        """
+        samples = frames.astype(np.float32) / 32768.0
+        energy_db = 10.0 * np.log10(np.mean(samples * samples, axis=1) + 1e-10)
+        signs = np.signbit(samples)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        snr = energy_db - self._noise_floor_db
+        speech = (energy_db > VAD_MIN_ENERGY_DB) & (
+            (snr > VAD_SNR_DB) | ((zcr > VAD_FRICATIVE_ZCR) & (snr > VAD_FRICATIVE_SNR_DB))
+        )
+
+        # Track the noise floor from the quietest frame of the chunk
+        quietest = float(np.min(energy_db))
+        rate = NOISE_FLOOR_FALL if quietest < self._noise_floor_db else NOISE_FLOOR_RISE
+        self._noise_floor_db += rate * (quietest - self._noise_floor_db)
+        return speech
+
+    def process(self, chunk):
+        """
+        Filters one chunk of int16 PCM.
+
+        Parameters:
+            chunk (bytes): Captured audio.
+
+        Returns:
+            bytes: The audio to send (possibly empty).
+        """
+        samples = np.concatenate((self._remainder, np.frombuffer(chunk, dtype=np.int16)))
+        n_frames = len(samples) // self.frame_len
+        self._remainder = samples[n_frames * self.frame_len:]
+        if n_frames == 0:
+            return b''
+
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        speech = self._classify(frames)
+        self.frames_in += n_frames
+
+        out = []
+        for frame, is_speech in zip(frames, speech):
+            if is_speech:
+                # Speech onset: flush the pre-roll first
+                out.extend(self._preroll)
+                self._preroll.clear()
+                out.append(frame)
+                self._hangover = self.hangover_frames
+                self._silent_frames = 0
+            elif self._hangover > 0:
+                out.append(frame)
+                self._hangover -= 1
+            else:
+                self._silent_frames += 1
+                if self._silent_frames >= self.keepalive_frames:
+                    out.append(frame)
+                    self._silent_frames = 0
+                else:
+                    self._preroll.append(frame)
+
+        self.frames_sent += len(out)
+        return np.concatenate(out).tobytes() if out else b''
+
+    def stats(self):
+        """
+        Returns the share of audio that was suppressed.
+        """
+        return {
+            "frames_in": self.frames_in,
+            "frames_sent": self.frames_sent,
+            "suppressed_ratio": 1 - self.frames_sent / self.frames_in if self.frames_in else 0.0,
+        }
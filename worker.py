@@ -0,0 +1,351 @@
+# worker.py
+
+"""
+Worker processes that run queued pipeline jobs (see job_queue.py).
+
+The Streamlit server starts JOB_WORKERS of them itself; to run the work on its own
+(e.g. with the server started with JOB_WORKERS=0), use:
+
+    python worker.py --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from job_queue import get_job_queue
+from pipeline import STAGE_ARTIFACTS, PipelineError, PipelineJob, recording_pipeline, upload_pipeline
+from storage import BucketWriter, get_write_behind
+
+JOB_WORKERS = 2                 # Worker processes started by the server; JOB_WORKERS in the environment overrides
+JOB_POLL_INTERVAL = 0.25        # Seconds an idle worker waits before asking the queue again
+JOB_HEARTBEAT_SECONDS = 2.0     # How often a running job renews its lease and publishes progress
+JOB_PREVIEW_INTERVAL = 0.2      # Shortest time between two updates of the streamed text
+JOB_PRUNE_INTERVAL = 3600       # Seconds between clean-ups of old finished jobs
+WORKER_RESTART_DELAY = 5.0      # Seconds between checks for worker processes that died
+
+# PipelineJob attributes saved after each step, so another worker can resume the job
+CHECKPOINT_FIELDS = (
+    'completed', 'timings', 'audio_key', 'audio_format', 'audio_hash', 'segmented',
+    'transcription_job', 'transcript', 'clean_text', 'summary_text', 'restored',
+)
+
+
+class _JobLost(Exception):
+    """
+    Raised into the pipeline once another worker has taken the job over, so this one
+    stops paying for stages the new owner runs again.
+    """
+
+
+class _TrackingWriter(BucketWriter):
+    """
+    BucketWriter that keeps its writes, so the ETags of the artifacts can be handed to
+    the page, which then caches them without downloading them again.
+    """
+
+    def __init__(self, bucket_name):
+        super().__init__(bucket_name)
+        self._writes = {}
+
+    def save(self, key, text, content_type='text/plain'):
+        future = super().save(key, text, content_type)
+        self._writes[key] = future
+        return future
+
+    def etags(self):
+        """
+        Returns key -> ETag of the writes that succeeded.
+        """
+        return {
+            key: future.result().get('ETag')
+            for key, future in self._writes.items()
+            if future.done() and future.exception() is None
+        }
+
+
+class _RunningJob:
+    """
+    A claimed job being run by this worker: turns pipeline progress events into queue
+    heartbeats, and keeps the job's checkpoint current.
+    """
+
+    def __init__(self, queue, queued, worker_name):
+        self.queue = queue
+        self.queued = queued
+        self.worker_name = worker_name
+        self.job = None
+        self.stage = None
+        self.progress = None
+        self.pieces = []                # Text generated by the current stage
+        self._last_preview = 0.0        # time.monotonic() of the last streamed-text update
+        self.error = None
+        self.lost = False               # Another worker took the job over
+        self._last_checkpoint = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self):
+        queued = self.queued
+        audio = open(queued.audio_path, 'rb') if queued.audio_path else None
+        writer = _TrackingWriter(queued.bucket_name)
+        try:
+            job = PipelineJob(
+                queued.folder_name,
+                queued.bucket_name,
+                writer,
+                audio=audio,
+                audio_format=queued.audio_format,
+                audio_basename='record' if queued.kind == 'recording' else 'audio',
+                **queued.options
+            )
+            self.job = job
+            if queued.checkpoint:
+                self._resume(job, queued.checkpoint)
+
+            if queued.kind == 'recording':
+                pipeline = recording_pipeline(audio_only=not queued.options.get('transcript'))
+            else:
+                pipeline = upload_pipeline()
+
+            heartbeat = threading.Thread(target=self._heartbeat, name=f"heartbeat-{queued.id}", daemon=True)
+            heartbeat.start()
+            try:
+                pipeline.run(job, self.report)
+                # The job is only done once its artifacts are in S3
+                for write in job.writes:
+                    write.result()
+            finally:
+                self._stopped.set()
+                heartbeat.join()
+        except Exception as e:
+            if self.lost:
+                # The job is the new owner's now; there is nothing to record
+                print(f"Stopped job {queued.id}: another worker runs it now")
+            elif isinstance(e, PipelineError):
+                self.queue.fail(queued.id, self.worker_name, e.stage, str(e.__cause__), self._checkpoint())
+            else:
+                self.queue.fail(queued.id, self.worker_name, self.stage, str(e), self._checkpoint())
+            return
+        finally:
+            if audio is not None:
+                audio.close()
+        # The final texts and their ETags let the page fill its artifact cache directly
+        checkpoint = self._checkpoint()
+        checkpoint['etags'] = writer.etags()
+        self.queue.complete(queued.id, self.worker_name, checkpoint)
+
+    def _resume(self, job, checkpoint):
+        """
+        Restores the state a previous worker saved. Artifacts of finished stages are
+        written again, since that worker may have died before its writes reached S3.
+        """
+        for name in CHECKPOINT_FIELDS:
+            if name in checkpoint:
+                setattr(job, name, checkpoint[name])
+        if job.restored:
+            return
+        for stage in job.completed:
+            file_name, attribute = STAGE_ARTIFACTS.get(stage, (None, None))
+            if file_name and getattr(job, attribute):
+                job.save(file_name, getattr(job, attribute))
+
+    def report(self, stage, event, data=None):
+        if self.lost:
+            raise _JobLost(self.queued.id)
+        with self._lock:
+            if event == 'start':
+                self.stage = stage
+                self.progress = None
+                self.pieces = []
+            elif event in ('upload', 'segments'):
+                done, total = data
+                self.progress = done / total if total else 1.0
+            elif event == 'text':
+                self.pieces.append(data)
+                publish = time.monotonic() - self._last_preview >= JOB_PREVIEW_INTERVAL
+            elif event == 'error':
+                self.error = f"{stage}: {data}"
+        if event in ('start', 'done', 'error') or (event == 'text' and publish):
+            # Streamed text is published as it arrives (throttled), not only on heartbeats.
+            # A checkpoint may list a stage whose artifact is still being written; that
+            # is safe, since _resume writes the artifacts of finished stages again
+            self._beat()
+
+    def _heartbeat(self):
+        while not self._stopped.wait(JOB_HEARTBEAT_SECONDS):
+            self._beat()
+
+    def _beat(self):
+        if self.lost:
+            return
+        with self._lock:
+            stage, progress, error = self.stage, self.progress, self.error
+            preview = ''.join(self.pieces) or None
+            if preview:
+                self._last_preview = time.monotonic()
+        checkpoint = self._checkpoint()
+        serialized = json.dumps(checkpoint, ensure_ascii=False, sort_keys=True)
+        changed = serialized != self._last_checkpoint
+        try:
+            owned = self.queue.heartbeat(
+                self.queued.id, self.worker_name, stage, progress, preview,
+                checkpoint=checkpoint if changed else None,
+                error=error
+            )
+        except Exception as e:
+            print(f"Heartbeat for job {self.queued.id} failed: {e}")
+            return
+        if changed:
+            self._last_checkpoint = serialized
+        if not owned:
+            # The next progress event aborts the pipeline (see report)
+            self.lost = True
+            print(f"Job {self.queued.id} was taken over by another worker")
+
+    def _checkpoint(self):
+        if self.job is None:
+            return None
+        checkpoint = {name: getattr(self.job, name) for name in CHECKPOINT_FIELDS}
+        # Copies, since the pipeline thread keeps appending while a heartbeat serializes
+        checkpoint['completed'] = list(checkpoint['completed'])
+        checkpoint['timings'] = dict(checkpoint['timings'])
+        return checkpoint
+
+
+def run_worker(worker_name, stop_event=None, poll_interval=JOB_POLL_INTERVAL):
+    """
+    Runs queued jobs one at a time until stop_event is set.
+
+    Parameters:
+        worker_name (str): Unique name recorded on the jobs this worker claims.
+        stop_event: A threading or multiprocessing Event, or None to run forever.
+        poll_interval (float): Seconds to wait when the queue is empty.
+    """
+    load_dotenv()
+    queue = get_job_queue()
+    last_prune = 0.0
+    while stop_event is None or not stop_event.is_set():
+        try:
+            queued = queue.claim(worker_name)
+            if queued is None and time.time() - last_prune > JOB_PRUNE_INTERVAL:
+                last_prune = time.time()
+                queue.prune()
+        except Exception as e:
+            print(f"Worker {worker_name} could not read the job queue: {e}")
+            queued = None
+        if queued is None:
+            if stop_event is not None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        _RunningJob(queue, queued, worker_name).run()
+    get_write_behind().flush()
+
+
+def _worker_process(worker_name, stop_event):
+    # Ctrl+C reaches the whole process group; the pool decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(worker_name, stop_event)
+
+
+class WorkerPool:
+    """
+    A pool of worker processes serving the job queue. Processes that die are replaced.
+
+    Processes are spawned (not forked), so they never inherit the server's threads,
+    clients or locks.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = self._context.Event()
+        self._workers = []
+        self._monitor = None
+
+    def start(self):
+        self._workers = [self._spawn() for _ in range(self.processes)]
+        self._monitor = threading.Thread(target=self._watch, name='worker-pool-monitor', daemon=True)
+        self._monitor.start()
+
+    def _spawn(self):
+        worker_name = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        process = self._context.Process(
+            target=_worker_process,
+            args=(worker_name, self._stop),
+            name=f"job-worker-{worker_name}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _watch(self):
+        while not self._stop.wait(WORKER_RESTART_DELAY):
+            for index, process in enumerate(self._workers):
+                if not process.is_alive():
+                    print(f"Worker {process.name} exited with code {process.exitcode}; starting a new one")
+                    self._workers[index] = self._spawn()
+
+    def stop(self, timeout=None):
+        """
+        Lets each worker finish its current job, then waits for it to exit. A job still
+        running at the timeout is resumed by another worker once its lease runs out.
+        """
+        self._stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for process in self._workers:
+            process.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def start_worker_pool():
+    """
+    Starts the process-wide worker pool on first call, sized by JOB_WORKERS in the
+    environment. With JOB_WORKERS=0 nothing is started and the queue is served by
+    separately run `python worker.py` processes.
+
+    Returns:
+        WorkerPool | None: The pool, if this process runs one.
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            load_dotenv()
+            processes = int(os.getenv('JOB_WORKERS', str(JOB_WORKERS)))
+            if processes <= 0:
+                return None
+            _worker_pool = WorkerPool(processes)
+            _worker_pool.start()
+        return _worker_pool
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run pipeline jobs from the job queue.")
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS,
+                        help="Worker processes (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    pool = WorkerPool(args.workers)
+    pool.start()
+    print(f"{args.workers} workers serving {get_job_queue().db_path}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping after the current jobs...")
+        pool.stop()
+
+
+if __name__ == '__main__':
+    main()